@@ -1,14 +1,26 @@
 from typing import Callable
+import copy
 import logging
 from enum import Enum
+import math
 
 import numpy as np
 from scipy.stats import norm
 from scipy.optimize import minimize
-from scipy.spatial.distance import cdist
+from scipy.linalg import cho_solve, cholesky, solve_triangular
+from scipy.special import erfc
 
 from common_types import MuscleMode
-from constants import PARAMS_BOUNDS
+from constants import PARAMS_BOUNDS_ARRAY, PARAMS_BOUNDS_MUSCLES
+
+
+_INV_SQRT2 = 1.0 / np.sqrt(2.0)
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+
+def _normal_cdf(z: np.ndarray) -> np.ndarray:
+    """Standard normal cdf computed directly with the erfc ufunc (avoids the scipy.stats dispatch overhead)"""
+    return 0.5 * erfc(-z * _INV_SQRT2)
 
 
 class BoType(Enum):
@@ -52,52 +64,199 @@ class GaussianProcess:
     It uses a Radial Basis Function kernel to estimate the covariance.
     """
 
-    def __init__(self, length_scale: float = 1.0, noise: float = 1e-6):
+    def __init__(self, length_scale: float = 1.0, noise: float = 1e-6, dtype: type = np.float64):
         """
         Parameters
         ----------
         length_scale: Kernel length scale. It controls how quickly the correlation decays with distance.
         noise: Noise level added to the diagonal of the covariance matrix for numerical stability. 
+        dtype: Floating point type of the GP computations. np.float32 halves the memory traffic, but the noise must
+            then stay well above its precision (~1e-7) for the Cholesky factorization to succeed.
         """
         self.length_scale = length_scale
         self.noise = noise
+        self.dtype = dtype
         self.input_training_data = None
         self.output_training_data = None
-        self.K_inv = None
+        self._training_sq_norms = None  # ||x||² of each training point, reused by every kernel evaluation
+        self.L = None
+        self.alpha = None
+
+        # Quantities derived from the training data, computed lazily and reset at each fit
+        self._K_inv = None
+        self._incumbent_prediction = None
+
+    @property
+    def length_scale(self) -> float:
+        return self._length_scale
+
+    @length_scale.setter
+    def length_scale(self, value: float):
+        self._length_scale = value
+        # Constant factor of the kernel exponent, computed once instead of at each kernel evaluation
+        self._inv_2ls2 = 0.5 / (value * value)
 
-    def rbf_kernel(self, x_1: np.ndarray, x_2: np.ndarray) -> np.ndarray:
-        """Radial Basis Function (squared exponential) kernel."""
-        dists = cdist(x_1, x_2, metric='sqeuclidean')
-        return np.exp(-0.5 * dists / (self.length_scale ** 2))
+    @staticmethod
+    def _sq_norms(x: np.ndarray) -> np.ndarray:
+        """Squared norm of each row of x."""
+        return np.einsum('ij,ij->i', x, x)
+
+    def rbf_kernel(
+            self,
+            x_1: np.ndarray,
+            x_2: np.ndarray,
+            x_1_sq_norms: np.ndarray = None,
+            x_2_sq_norms: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Radial Basis Function (squared exponential) kernel.
+
+        Parameters
+        ----------
+        x_1: First set of points, shape (n_1, n_params)
+        x_2: Second set of points, shape (n_2, n_params)
+        x_1_sq_norms: Precomputed squared norms of the rows of x_1, computed here if not provided
+        x_2_sq_norms: Precomputed squared norms of the rows of x_2, computed here if not provided
+        """
+        if x_1_sq_norms is None:
+            x_1_sq_norms = self._sq_norms(x_1)
+        if x_2_sq_norms is None:
+            x_2_sq_norms = self._sq_norms(x_2)
+
+        # ||x_1 - x_2||² = ||x_1||² + ||x_2||² - 2 x_1.x_2 so that most of the work is a single matrix product.
+        # All the following operations are done in place in the output of the matrix product.
+        dists = x_1 @ x_2.T
+        dists *= -2.0
+        dists += x_1_sq_norms[:, None]
+        dists += x_2_sq_norms[None, :]
+        np.maximum(dists, 0.0, out=dists)  # Remove the small negative values due to round-off errors
+        np.multiply(dists, -self._inv_2ls2, out=dists)
+        return np.exp(dists, out=dists)
 
     def fit(self, input_data: np.ndarray, output_data: np.ndarray) -> None:
         """Fit the GP to training data."""
-        self.input_training_data = np.array(input_data)
-        self.output_training_data = np.array(output_data).flatten()
+        # No copy when the data already has the right type (e.g. slices of the optimizer observation buffers)
+        self.input_training_data = np.asarray(input_data, dtype=self.dtype)
+        self.output_training_data = np.asarray(output_data, dtype=self.dtype).ravel()
 
-        K = self.rbf_kernel(self.input_training_data, self.input_training_data)
+        self._training_sq_norms = self._sq_norms(self.input_training_data)
+
+        K = self.rbf_kernel(
+            self.input_training_data,
+            self.input_training_data,
+            self._training_sq_norms,
+            self._training_sq_norms,
+        )
         K += self.noise * np.eye(len(self.input_training_data))
 
-        self.K_inv = np.linalg.inv(K)
+        # Cholesky factorization (K = L @ L.T) is faster and more stable than inverting K.
+        # The GP builds all its matrices itself, so LAPACK is called directly without the finiteness checks.
+        self.L = cholesky(K, lower=True, overwrite_a=True, check_finite=False)
+        self.alpha = cho_solve((self.L, True), self.output_training_data, check_finite=False)
+        self._K_inv = None
+        self._incumbent_prediction = None
+
+    @property
+    def K_inv(self) -> np.ndarray:
+        """Inverse of the training covariance matrix, only computed if needed."""
+        if self._K_inv is None:
+            L_inv = solve_triangular(self.L, np.eye(self.L.shape[0]), lower=True, check_finite=False)
+            self._K_inv = L_inv.T @ L_inv
+        return self._K_inv
+
+    def add_observation(self, x_new: np.ndarray, y_new: float) -> None:
+        """
+        Add one observation to an already fitted GP.
+        The Cholesky factor is extended by one row in O(n²) instead of being recomputed from scratch in O(n³).
+        """
+        if self.L is None:
+            self.fit(np.reshape(x_new, (1, -1)), np.reshape(y_new, (1,)))
+            return
+
+        x_new = np.array(x_new, dtype=self.dtype).reshape(1, -1)
+        x_new_sq_norm = self._sq_norms(x_new)
+        k_new = self.rbf_kernel(self.input_training_data, x_new, self._training_sq_norms, x_new_sq_norm)[:, 0]
+        k_new_new = 1.0 + self.noise  # k(x, x) = 1 for the RBF kernel
+
+        # New row of L: [l_new, l_new_new] such that L_new @ L_new.T = [[K, k_new], [k_new.T, k_new_new]]
+        l_new = solve_triangular(self.L, k_new, lower=True, check_finite=False)
+        l_new_new_squared = k_new_new - l_new @ l_new
+        if l_new_new_squared <= 0:
+            # Numerically degenerate (e.g. duplicated point), refit from scratch
+            self.fit(
+                np.vstack((self.input_training_data, x_new)),
+                np.append(self.output_training_data, y_new),
+            )
+            return
+
+        n = self.L.shape[0]
+        L = np.zeros((n + 1, n + 1), dtype=self.dtype)
+        L[:n, :n] = self.L
+        L[n, :n] = l_new
+        L[n, n] = np.sqrt(l_new_new_squared)
+        self.L = L
+
+        self.input_training_data = np.vstack((self.input_training_data, x_new))
+        self._training_sq_norms = np.append(self._training_sq_norms, x_new_sq_norm)
+        self.output_training_data = np.append(self.output_training_data, y_new)
+        self.alpha = cho_solve((self.L, True), self.output_training_data, check_finite=False)
+        self._K_inv = None
+        self._incumbent_prediction = None
 
     def predict(self, test_data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
         """Predict mean and standard deviation at X."""
-        test_data = np.array(test_data)
+        test_data = np.array(test_data, dtype=self.dtype)
         if test_data.ndim == 1:
             test_data = test_data.reshape(1, -1)
 
-        K_star = self.rbf_kernel(test_data, self.input_training_data)
-        K_star_star = self.rbf_kernel(test_data, test_data)
+        K_star = self.rbf_kernel(test_data, self.input_training_data, x_2_sq_norms=self._training_sq_norms)
 
         # Mean prediction
-        mean = K_star @ self.K_inv @ self.output_training_data
+        mean = K_star @ self.alpha
 
         # Variance prediction
-        var = K_star_star - K_star @ self.K_inv @ K_star.T
-        std = np.sqrt(np.maximum(np.diag(var), 1e-10))
+        v = solve_triangular(self.L, K_star.T, lower=True, check_finite=False)
+        # Only the diagonal of K(test_data, test_data) is needed, and it is always 1 for the RBF kernel
+        var = 1.0 - np.einsum('ij,ij->j', v, v)
+        std = np.sqrt(np.maximum(var, 1e-10))
 
         return mean, std
 
+    def predict_with_grad(self, x: np.ndarray) -> tuple[float, float, np.ndarray, np.ndarray]:
+        """
+        Predict mean and standard deviation at a single point x, together with their gradient with respect to x.
+
+        Returns
+        -------
+        mean, std, dmean_dx, dstd_dx
+        """
+        x = np.asarray(x, dtype=self.dtype).reshape(1, -1)
+
+        k_star = self.rbf_kernel(x, self.input_training_data, x_2_sq_norms=self._training_sq_norms)[0]
+        # dk_star/dx = -k_star * (x - X) / length_scale², shape (n_training, n_params)
+        dk_star = (self.input_training_data - x) * (k_star / self.length_scale ** 2)[:, None]
+
+        mean = k_star @ self.alpha
+        dmean_dx = dk_star.T @ self.alpha
+
+        K_inv_k_star = cho_solve((self.L, True), k_star, check_finite=False)
+        var = 1.0 - k_star @ K_inv_k_star
+        if var < 1e-10:
+            # The variance is clipped, so it does not depend on x anymore
+            return mean, np.sqrt(1e-10), dmean_dx, np.zeros_like(dmean_dx)
+        std = np.sqrt(var)
+        dvar_dx = -2.0 * dk_star.T @ K_inv_k_star
+        dstd_dx = dvar_dx / (2.0 * std)
+
+        return mean, std, dmean_dx, dstd_dx
+
+    def predict_incumbent(self) -> tuple[np.ndarray, np.ndarray]:
+        """Predict mean and standard deviation at the best observed point (cached until the next fit)."""
+        if self._incumbent_prediction is None:
+            best_x = self.input_training_data[np.argmin(self.output_training_data)]
+            self._incumbent_prediction = self.predict(best_x)
+        return self._incumbent_prediction
+
 
 class BayesianOptimizer:
     """Bayesian Optimization using Probability of Improvement."""
@@ -105,9 +264,12 @@ class BayesianOptimizer:
     def __init__(
             self,
             iteration_func: Callable,
-            muscle_mode: MuscleMode.BICEPS_TRICEPS | MuscleMode.DELTOIDS,
+            muscle_mode: MuscleMode,
             xi: float = 0.01,
             length_scale: float = 1.0,
+            bounds: np.ndarray = None,
+            noise: float = 1e-6,
+            dtype: type = np.float64,
     ):
         """
         Parameters
@@ -115,16 +277,30 @@ class BayesianOptimizer:
         iteration_func: The function to minimize
         xi: Exploration parameter for Probability of Improvement. Higher values encourage exploration.
         length_scale: GP kernel length scale. Higher values lead to smoother functions.
+        bounds: Parameter bounds of each muscle, shape (n_muscles, n_params, 2). Built from PARAMS_BOUNDS if not provided.
+        noise: GP noise level added to the diagonal of the covariance matrix.
+        dtype: Floating point type of the GP computations (see GaussianProcess). np.float32 needs a larger noise.
         """
         self.iteration_func = iteration_func
         self.muscle_mode = muscle_mode
         self.n_params = 3
         self.xi = xi
-        self.gp = {muscle: GaussianProcess(length_scale=length_scale) for muscle in self.muscle_mode.muscle_keys}
+        self.gp = {
+            muscle: GaussianProcess(length_scale=length_scale, noise=noise, dtype=dtype)
+            for muscle in self.muscle_mode.muscle_keys
+        }
         self.bo_type = BoType.PROBABILITY_OF_IMPROVEMENT  # TOBECHANGED: Should try noisy EI
 
+        # Parameter bounds, shape (n_muscles, n_params, 2), built once since they do not change during the optimization
+        if bounds is None:
+            bounds = PARAMS_BOUNDS_ARRAY[[PARAMS_BOUNDS_MUSCLES.index(muscle) for muscle in self.muscle_mode.muscle_keys]]
+        self._stacked_bounds = np.array(bounds, dtype=float)
+        self._bounds = {muscle: self._stacked_bounds[i_muscle] for i_muscle, muscle in enumerate(self.muscle_mode.muscle_keys)}
+
+        # Observation buffers, only the first n_observed rows are valid (see _reserve_observations)
+        self.n_observed = 0
         self.input_observed = {muscle: np.empty((0, self.n_params)) for muscle in self.muscle_mode.muscle_keys}
-        self.output_observed = {muscle: np.empty((0, 1)) for muscle in self.muscle_mode.muscle_keys}
+        self.output_observed = {muscle: np.empty((0,)) for muscle in self.muscle_mode.muscle_keys}
         self.best_x = {muscle: np.empty((0, 1)) for muscle in self.muscle_mode.muscle_keys}
         self.best_y = {muscle: np.inf for muscle in self.muscle_mode.muscle_keys}
 
@@ -135,9 +311,22 @@ class BayesianOptimizer:
         )
         self._logger = logging.getLogger("BO OPTIM")
 
+    def _reserve_observations(self, n_max: int) -> None:
+        """Make sure the observation buffers can hold n_max observations, so that they are filled in place."""
+        if n_max <= self.input_observed[self.muscle_mode.muscle_keys[0]].shape[0]:
+            return
+        for muscle in self.muscle_mode.muscle_keys:
+            input_observed = np.empty((n_max, self.n_params))
+            input_observed[:self.n_observed] = self.input_observed[muscle][:self.n_observed]
+            self.input_observed[muscle] = input_observed
+
+            output_observed = np.empty((n_max,))
+            output_observed[:self.n_observed] = self.output_observed[muscle][:self.n_observed]
+            self.output_observed[muscle] = output_observed
+
     def bounds(self, muscle: str) -> np.ndarray:
         """Get parameter bounds as a numpy array."""
-        return np.array([PARAMS_BOUNDS[muscle][key] for key in PARAMS_BOUNDS[muscle].keys()])  # shape (n_params, 2)
+        return self._bounds[muscle]  # shape (n_params, 2)
 
     def probability_of_improvement(self, x: np.ndarray, muscle: str) -> np.ndarray:
         """
@@ -148,11 +337,14 @@ class BayesianOptimizer:
         mean, std = self.gp[muscle].predict(x)
 
         # Avoid division by zero
-        std = np.maximum(std, 1e-10)
+        np.maximum(std, 1e-10, out=std)
 
-        # Calculate PI (for minimization)
-        z = (self.best_y[muscle] - mean - self.xi) / std
-        pi = norm.cdf(z)
+        # Calculate PI (for minimization), in place in the prediction arrays to avoid temporaries
+        z = np.subtract(self.best_y[muscle] - self.xi, mean, out=mean)
+        z /= std
+        z *= -_INV_SQRT2
+        pi = erfc(z, out=z)
+        pi *= 0.5
 
         return pi
 
@@ -170,7 +362,7 @@ class BayesianOptimizer:
 
         # Calculate EI (for minimization)
         z = (self.best_y[muscle] - mean - self.xi) / std
-        ei = (self.best_y[muscle] - mean - self.xi) * norm.cdf(z) + std * norm.pdf(z)
+        ei = (self.best_y[muscle] - mean - self.xi) * _normal_cdf(z) + std * norm.pdf(z)
 
         return ei
 
@@ -190,9 +382,8 @@ class BayesianOptimizer:
         x = np.array(x).reshape(-1, self.n_params)
         mean, std = self.gp[muscle].predict(x)
 
-        # Get incumbent (best point) predictions
-        best_x = self.input_observed[muscle][np.argmin(self.output_observed[muscle])].reshape(1, -1)
-        mean_incumbent, std_incumbent = self.gp[muscle].predict(best_x)
+        # Get incumbent (best point) predictions, they do not change until the GP is refitted
+        mean_incumbent, std_incumbent = self.gp[muscle].predict_incumbent()
 
         # Avoid division by zero
         std = np.maximum(std, 1e-10)
@@ -205,46 +396,86 @@ class BayesianOptimizer:
         gamma = (mean_incumbent - mean - self.xi) / composite_std
 
         # Calculate NEI
-        nei = std_incumbent * (gamma * norm.cdf(gamma) + norm.pdf(gamma))
+        nei = std_incumbent * (gamma * _normal_cdf(gamma) + norm.pdf(gamma))
 
         return nei
 
-    def _acquisition_to_minimize(self, x: np.ndarray, muscle: str) -> float:
-        """Negative PI for minimization."""
+    def _acquisition(self, x: np.ndarray, muscle: str) -> np.ndarray:
+        """Evaluate the selected acquisition function at each row of x."""
         if self.bo_type == BoType.EXPECTED_IMPROVEMENT:
-            return -self.expected_improvement(x.reshape(1, -1), muscle)[0]
+            return self.expected_improvement(x, muscle)
         elif self.bo_type == BoType.NOISY_EXPECTED_IMPROVEMENT:
-            return -self.noisy_expected_improvement(x.reshape(1, -1), muscle)[0]
+            return self.noisy_expected_improvement(x, muscle)
         elif self.bo_type == BoType.PROBABILITY_OF_IMPROVEMENT:
-            return -self.probability_of_improvement(x.reshape(1, -1), muscle)[0]
+            return self.probability_of_improvement(x, muscle)
         else:
             raise ValueError(f"Unknown BO type: {self.bo_type}")
 
-    def suggest_next_point(self, n_restarts: int = 10) -> np.ndarray:
+    def _acquisition_to_minimize(self, x: np.ndarray, muscle: str) -> float:
+        """Negative acquisition for minimization."""
+        return -self._acquisition(x.reshape(1, -1), muscle)[0]
+
+    def _probability_of_improvement_to_minimize(self, x: np.ndarray, muscle: str) -> tuple[float, np.ndarray]:
+        """Negative Probability of Improvement and its analytic gradient, so that L-BFGS-B does not need finite differences."""
+        mean, std, dmean_dx, dstd_dx = self.gp[muscle].predict_with_grad(x)
+
+        # Scalar part with Python floats, which is cheaper than numpy for a single point
+        std = max(float(std), 1e-10)
+        improvement = self.best_y[muscle] - float(mean) - self.xi
+        z = improvement / std
+        pi = 0.5 * math.erfc(-z * _INV_SQRT2)
+        pdf = math.exp(-0.5 * z * z) * _INV_SQRT_2PI
+
+        # dPI/dx = φ(z) * dz/dx, with dz/dx = -(dmean/dx * std + improvement * dstd/dx) / std²
+        dpi_dx = dmean_dx * std
+        dpi_dx += improvement * dstd_dx
+        dpi_dx *= -pdf / (std * std)
+
+        return -pi, -dpi_dx.astype(np.float64)
+
+    def suggest_next_point(self, n_restarts: int = 10, n_candidates: int = 1000) -> np.ndarray:
         """
-        Find the point that maximizes PI.
+        Find the point that maximizes the acquisition function.
+        A batch of random candidates is evaluated at once, and only the most promising ones are used as starting
+        points for the local optimization.
 
         Parameters
         ----------
-        n_restarts: Number of random restarts for optimization
+        n_restarts: Number of starting points for the local optimization
+        n_candidates: Number of random candidates evaluated to choose the starting points
         """
+        # Draw the random candidates of all the muscles at once, shape (n_muscles, n_candidates, n_params)
+        n_muscles = len(self.muscle_mode.muscle_keys)
+        all_candidates = np.random.uniform(
+            self._stacked_bounds[:, np.newaxis, :, 0],
+            self._stacked_bounds[:, np.newaxis, :, 1],
+            size=(n_muscles, n_candidates, self.n_params),
+        )
+
+        if self.bo_type == BoType.PROBABILITY_OF_IMPROVEMENT:
+            objective, jac = self._probability_of_improvement_to_minimize, True
+        else:
+            objective, jac = self._acquisition_to_minimize, None
+
         next_x = []
-        for muscle in self.muscle_mode.muscle_keys:
+        for i_muscle, muscle in enumerate(self.muscle_mode.muscle_keys):
             best_x: list[float] = None
             best_acquisition: float = np.inf
+            bounds = self.bounds(muscle)
 
-            # Multi-start optimization
-            for _ in range(n_restarts):
-                # Random starting point
-                x0 = np.random.uniform(
-                    self.bounds(muscle)[:, 0],
-                    self.bounds(muscle)[:, 1]
-                )
+            # Evaluate all the random candidates in one GP prediction
+            candidates = all_candidates[i_muscle]
+            acquisition = self._acquisition(candidates, muscle)
+            starting_points = candidates[np.argsort(-acquisition)[:n_restarts]]
 
+            # Multi-start optimization from the best candidates
+            for x0 in starting_points:
                 result = minimize(
-                    lambda x: self._acquisition_to_minimize(x, muscle),
+                    objective,
                     x0=x0,
-                    bounds=self.bounds(muscle),
+                    args=(muscle,),
+                    jac=jac,
+                    bounds=bounds,
                     method='L-BFGS-B',
                 )
 
@@ -255,6 +486,35 @@ class BayesianOptimizer:
             next_x += best_x.tolist()
         return next_x
 
+    def suggest_next_points(self, batch_size: int) -> list[list[float]]:
+        """
+        Suggest several points to evaluate one after the other without optimizing the acquisition in between.
+        After each suggestion, the GPs are conditioned on their own predicted mean at this point (kriging believer), so
+        that the uncertainty there collapses and the next suggestion explores elsewhere. The GPs are restored afterward.
+
+        Parameters
+        ----------
+        batch_size: Number of points to suggest
+        """
+        if batch_size == 1:
+            return [self.suggest_next_point()]
+
+        # add_observation always rebinds the GP arrays, so shallow copies are enough to restore the GPs
+        gp = self.gp
+        self.gp = {muscle: copy.copy(gp[muscle]) for muscle in self.muscle_mode.muscle_keys}
+        try:
+            next_points = []
+            for _ in range(batch_size):
+                next_x = self.suggest_next_point()
+                next_points.append(next_x)
+                for i_muscle, muscle in enumerate(self.muscle_mode.muscle_keys):
+                    parameters_this_muscle = next_x[i_muscle * 3:(i_muscle + 1) * 3]
+                    mean, _ = self.gp[muscle].predict(parameters_this_muscle)
+                    self.gp[muscle].add_observation(parameters_this_muscle, mean[0])
+        finally:
+            self.gp = gp
+        return next_points
+
     def initialize(self, nb_init_intensity_increasing_steps: int):
         """
         Initialize predefined samples with random onset and offset, but with incremental intensity so that the
@@ -263,80 +523,103 @@ class BayesianOptimizer:
         Parameters
             nb_init_intensity_increasing_steps: Number of initial random samples
         """
+        self._reserve_observations(self.n_observed + nb_init_intensity_increasing_steps)
+
         for i_init in range(nb_init_intensity_increasing_steps):
             # Get the initial parameters to test
             x = []
             x_all = []
             for muscle in self.muscle_mode.muscle_keys:
-                intensity_increment = (PARAMS_BOUNDS[muscle]["pulse_intensity"][1] - PARAMS_BOUNDS[muscle]["pulse_intensity"][0]) / (
-                            nb_init_intensity_increasing_steps - 1)
+                (onset_min, onset_max), (offset_min, offset_max), (intensity_min, intensity_max) = self._bounds[muscle]
+                intensity_increment = (intensity_max - intensity_min) / (nb_init_intensity_increasing_steps - 1)
 
                 # Random angles
-                onset_this_time = np.random.uniform(
-                    PARAMS_BOUNDS[muscle]["onset_deg"][0],
-                    PARAMS_BOUNDS[muscle]["onset_deg"][1],
-                )
-                offset_this_time = np.random.uniform(
-                    PARAMS_BOUNDS[muscle]["offset_deg"][0],
-                    PARAMS_BOUNDS[muscle]["offset_deg"][1],
-                )
+                onset_this_time = np.random.uniform(onset_min, onset_max)
+                offset_this_time = np.random.uniform(offset_min, offset_max)
 
                 # Incremental intensity
-                intensity_this_time = PARAMS_BOUNDS[muscle]["pulse_intensity"][0] + i_init * intensity_increment
+                intensity_this_time = intensity_min + i_init * intensity_increment
 
                 x += [[onset_this_time, offset_this_time, intensity_this_time]]
                 x_all += [onset_this_time, offset_this_time, intensity_this_time]
 
             cost_list = self.iteration_func(x_all)
             for i_muscle, muscle in enumerate(self.muscle_mode.muscle_keys):
-                y = np.array(cost_list[i_muscle]).reshape(1, 1)
+                y = float(cost_list[i_muscle])
 
-                self.input_observed[muscle] = np.vstack((self.input_observed[muscle], np.array(x[i_muscle]).reshape(1, 3)))
-                self.output_observed[muscle] = np.vstack((self.output_observed[muscle], y))
+                self.input_observed[muscle][self.n_observed] = x[i_muscle]
+                self.output_observed[muscle][self.n_observed] = y
 
                 if y < self.best_y[muscle]:
-                    self.best_y[muscle] = float(y)
-                    self.best_x[muscle] = x[i_muscle].copy()
+                    self.best_y[muscle] = y
+                    # x is rebuilt at each step, so the list can be kept without copying it
+                    self.best_x[muscle] = x[i_muscle]
+            self.n_observed += 1
 
         for muscle in self.muscle_mode.muscle_keys:
-            self.gp[muscle].fit(self.input_observed[muscle], self.output_observed[muscle])
+            self.gp[muscle].fit(
+                self.input_observed[muscle][:self.n_observed],
+                self.output_observed[muscle][:self.n_observed],
+            )
 
-    def optimize(self, n_iterations: int = 20, nb_init_intensity_increasing_steps: int = 8) -> dict[str, OptimizationResults]:
+    def optimize(
+            self,
+            n_iterations: int = 20,
+            nb_init_intensity_increasing_steps: int = 8,
+            batch_size: int = 1,
+            incremental: bool = True,
+    ) -> dict[str, OptimizationResults]:
         """
         Run the Bayesian Optimization loop.
 
         Parameters:
             n_iterations: Number of optimization iterations
             nb_init_intensity_increasing_steps: Number of initial incremental steps to evaluate before starting the optimization.
+            batch_size: Number of points suggested at once (see suggest_next_points). They are still evaluated one
+                after the other, but the acquisition is optimized only once per batch.
+            incremental: If True, each new observation extends the Cholesky factor of the GP in O(n²). If False, the GP
+                is refitted from scratch in O(n³), which can be used to rule out any accumulated round-off error.
         """
+        self._reserve_observations(self.n_observed + nb_init_intensity_increasing_steps + n_iterations)
+
         # Initialize with random samples
         self._logger.info(f"Initializing with random samples...")
         self.initialize(nb_init_intensity_increasing_steps)
 
         # Main optimization loop
+        pending_points = []
         for i_iter in range(n_iterations):
             # Find next point to evaluate
-            next_x = self.suggest_next_point()
+            if len(pending_points) == 0:
+                pending_points = self.suggest_next_points(min(batch_size, n_iterations - i_iter))
+            next_x = pending_points.pop(0)
 
             # Evaluate objective function
             next_y = self.iteration_func(next_x)
 
             # Update observations
             for i_muscle, muscle in enumerate(self.muscle_mode.muscle_keys):
-                parameters_this_muscle = np.array(next_x[i_muscle * 3:(i_muscle + 1) * 3]).reshape(1, 3)
-                self.input_observed[muscle] = np.vstack((self.input_observed[muscle], parameters_this_muscle))
-                self.output_observed[muscle] = np.vstack((self.output_observed[muscle], next_y[i_muscle]))
+                parameters_this_muscle = self.input_observed[muscle][self.n_observed]
+                parameters_this_muscle[:] = next_x[i_muscle * 3:(i_muscle + 1) * 3]
+                self.output_observed[muscle][self.n_observed] = next_y[i_muscle]
 
                 # Update best
                 if next_y[i_muscle] < self.best_y[muscle]:
                     self.best_y[muscle] = next_y[i_muscle]
-                    self.best_x[muscle] = parameters_this_muscle
+                    self.best_x[muscle] = parameters_this_muscle.reshape(1, 3).copy()
 
-                # Refit GP
-                self.gp[muscle].fit(self.input_observed[muscle], self.output_observed[muscle])
+                # Update the GP with the new observation
+                if incremental:
+                    self.gp[muscle].add_observation(parameters_this_muscle, next_y[i_muscle])
+                else:
+                    self.gp[muscle].fit(
+                        self.input_observed[muscle][:self.n_observed + 1],
+                        self.output_observed[muscle][:self.n_observed + 1],
+                    )
 
                 self._logger.info(f"[BO OPTIM] Iteration {i_iter + 1}/{n_iterations}: "
                                   f"y = {next_y[i_muscle]}, best = {self.best_y[muscle]}")
+            self.n_observed += 1
 
         return {muscle: OptimizationResults(self.best_x[muscle], self.best_y[muscle]) for muscle in self.muscle_mode.muscle_keys}
 
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import json
 import logging
+import math
 import threading
-from typing import Dict, List, Callable
-import time
+from datetime import datetime
+from typing import Dict, List
 import pickle
 
 import numpy as np
@@ -35,13 +37,15 @@ class BayesianOptimizationWorker:
         stop_event: threading.Event,
         worker_pedal: PedalWorker,
         worker_stim: StimulationWorker,
-        muscle_mode: MuscleMode.BICEPS_TRICEPS | MuscleMode.DELTOIDS,
+        muscle_mode: MuscleMode,
         nb_cycles_to_run: int = 5,
         nb_cycles_to_keep: int = 3,
         nb_init_intensity_increasing_steps: int = 8,
         n_iterations: int = 50,
+        batch_size: int = 1,
         really_change_stim_intensity: bool = True,
         worker_plot: LivePlotter = None,
+        cycles_dtype: type = np.float64,
     ):
         # self.job_queue = job_queue
         self.stop_event = stop_event
@@ -49,6 +53,7 @@ class BayesianOptimizationWorker:
         self.nb_cycles_to_keep = nb_cycles_to_keep
         self.nb_init_intensity_increasing_steps = nb_init_intensity_increasing_steps
         self.n_iterations = n_iterations
+        self.batch_size = batch_size
 
         # Flag to stop the thread
         self._keep_running = True
@@ -64,6 +69,7 @@ class BayesianOptimizationWorker:
         self.worker_plot = worker_plot
 
         self.space: dict[str, list[Real]] = {muscle: [] for muscle in self.muscle_mode.muscle_keys}
+        self.bounds: np.ndarray = None  # shape (n_muscles, n_params, 2)
         self.build_search_space()
 
         # Store the iterations
@@ -74,20 +80,40 @@ class BayesianOptimizationWorker:
 
         self.best_result_dict: dict[str, float] = {muscle: None for muscle in self.muscle_mode.muscle_keys}  # will hold gp_minimize's result
 
+        # Log file where each iteration is appended as soon as it is evaluated, so that nothing is lost on a crash.
+        # It is timestamped so that restarting the optimization after a crash does not overwrite it.
+        self.log_file_name = f"bo_results_{self.muscle_mode.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        self._log_file = None
+
         # Debugging flag to avoid large stim during tests
         self.really_change_stim_intensity = really_change_stim_intensity
 
-        # cost functions for each muscle
-        self.cost_function: dict[str, Callable] = {
-            "biceps_r": self._biceps_r_cost,
-            "triceps_r": self._triceps_r_cost,
-            "biceps_l": self._biceps_l_cost,
-            "triceps_l": self._triceps_l_cost,
-            "delt_post_r": self._biceps_r_cost,  # This is not a bad copy-paste.
-            "delt_ant_r": self._triceps_r_cost,  # The function is the same, except the name of the muscle
-            "delt_post_l": self._biceps_l_cost,
-            "delt_ant_l": self._triceps_l_cost,
+        # Angle range on which the power is maximized for each muscle: (side, whether the range is inside or outside
+        # the CUTOFF_ANGLES of this side)
+        self.cost_angle_range: dict[str, tuple[str, bool]] = {
+            "biceps_r": ("right", True),
+            "triceps_r": ("right", False),
+            "biceps_l": ("left", False),
+            "triceps_l": ("left", True),
+            "delt_post_r": ("right", True),  # This is not a bad copy-paste.
+            "delt_ant_r": ("right", False),  # The range is the same, except the name of the muscle
+            "delt_post_l": ("left", False),
+            "delt_ant_l": ("left", True),
+        }
+        # Buffer holding the concatenated angles, left power and right power of the last cycles.
+        # np.float32 halves the memory traffic of the cost computation, the sums are still accumulated in float64.
+        self.cycles_dtype = cycles_dtype
+        self._cycles_buffer = np.empty((3, 0), dtype=self.cycles_dtype)
+
+        # The cutoff angles are constant, so they are converted to radians only once
+        self.cutoff_angles_rad: dict[str, tuple[float, float]] = {
+            side: (math.radians(lower_bound), math.radians(upper_bound))
+            for side, (lower_bound, upper_bound) in CUTOFF_ANGLES.items()
         }
+        # Angle ranges of the muscles of this mode, stacked so that all the costs are evaluated at once
+        self._cost_sides = [self.cost_angle_range[muscle][0] for muscle in self.muscle_mode.muscle_keys]
+        self._cost_bounds = np.array([self.cutoff_angles_rad[side] for side in self._cost_sides])  # (n_muscles, 2)
+        self._cost_outside = np.array([not self.cost_angle_range[muscle][1] for muscle in self.muscle_mode.muscle_keys])
 
         # Logging
         logging.basicConfig(
@@ -99,40 +125,35 @@ class BayesianOptimizationWorker:
     def build_search_space(self):
         """
         Create skopt search space: 4 parameters × 4 muscles = 16 dimensions.
+        The same bounds are also stored as a numpy array to be passed to the BayesianOptimizer.
         """
         for muscle in self.muscle_mode.muscle_keys:
             for param_name in PARAMS_BOUNDS[muscle].keys():
                 low, high = PARAMS_BOUNDS[muscle][param_name]
                 dim_name = f"{param_name}_{muscle}"
                 self.space[muscle].append(Real(low, high, name=dim_name))
+        self.bounds = np.array([[(dim.low, dim.high) for dim in self.space[muscle]] for muscle in self.muscle_mode.muscle_keys])
 
     def get_num_cycles(self) -> int:
         """
         Count the number of complete cycles in the data collector buffer.
         Each cycle is defined as angle going from -90° to 270°.
         """
-        angles = self.worker_pedal.data_collector.data.values[:, DataType.A18.value]
-        num_cycles = 0
-        for i in range(1, len(angles)):
-            current_angle = angles[i]
-            previous_angle = angles[i - 1]
-            nb_rotations = current_angle // (2 * np.pi)
-            if np.sign(current_angle - (nb_rotations * 2 * np.pi)) != np.sign(
-                    previous_angle - (nb_rotations * 2 * np.pi)):
-                num_cycles += 1
-        return num_cycles
+        return len(self.worker_pedal.get_cycle_boundaries())
 
     def get_last_cycles_data(self) -> Dict[str, list[np.ndarray]]:
         """
         Extract the last nb_cycles from the data collector buffer.
         Each cycle is defined as angle going from 0° to 360°.
-        TODO: this piece of code is very similar to the one in pedal_worker, refactor it.
         """
-        times_vector = self.worker_pedal.data_collector.data.timestamp
-        angles = self.worker_pedal.data_collector.data.values[:, DataType.A18.value]
-        left_power = self.worker_pedal.data_collector.data.values[:, DataType.A36.value]
-        right_power = self.worker_pedal.data_collector.data.values[:, DataType.A37.value]
-        total_power = self.worker_pedal.data_collector.data.values[:, DataType.A38.value]
+        # Read the collector data once, the columns and the cycles below are only views on it
+        data = self.worker_pedal.data_collector.data
+        values = data.values
+        times_vector = data.timestamp
+        angles = values[:, DataType.A18.value]
+        left_power = values[:, DataType.A36.value]
+        right_power = values[:, DataType.A37.value]
+        total_power = values[:, DataType.A38.value]
 
         last_cycles_data = {
             "times_vector": [],
@@ -141,31 +162,15 @@ class BayesianOptimizationWorker:
             "right_power": [],
             "total_power": [],
         }
-        last_idx = len(angles) - 1
-        cycles_identified = 0
-        last_bound = None
-        while last_idx > 0 and cycles_identified < self.nb_cycles_to_keep:
-            current_angle = angles[last_idx]
-            previous_angle = angles[last_idx - 1]
-            nb_rotations = current_angle // (2 * np.pi)
-            if np.sign(current_angle - (nb_rotations * 2 * np.pi)) != np.sign(
-                    previous_angle - (nb_rotations * 2 * np.pi)):
-                if last_bound is None:
-                    # The end of the last cycle was detected
-                    last_bound = last_idx
-                else:
-                    # The beginning of this cycle was detected, extract data for this cycle
-                    start_idx = last_idx
-                    end_idx = last_bound
-                    last_cycles_data["times_vector"].insert(0, times_vector[start_idx:end_idx])
-                    last_cycles_data["angles"].insert(0, self.worker_pedal.rotated_angle(angles[start_idx:end_idx]))
-                    last_cycles_data["left_power"].insert(0, left_power[start_idx:end_idx])
-                    last_cycles_data["right_power"].insert(0, right_power[start_idx:end_idx])
-                    last_cycles_data["total_power"].insert(0, total_power[start_idx:end_idx])
-                    last_bound = last_idx
-
-            cycles_identified = len(last_cycles_data["times_vector"])
-            last_idx -= 1
+        # Indices where a new cycle starts (detected by the pedal worker as the data arrives), only the last
+        # nb_cycles_to_keep + 1 are needed to delimit the last cycles
+        boundaries = self.worker_pedal.get_cycle_boundaries()[-(self.nb_cycles_to_keep + 1):]
+        for start_idx, end_idx in zip(boundaries[:-1], boundaries[1:]):
+            last_cycles_data["times_vector"].append(times_vector[start_idx:end_idx])
+            last_cycles_data["angles"].append(self.worker_pedal.rotated_angle(angles[start_idx:end_idx]))
+            last_cycles_data["left_power"].append(left_power[start_idx:end_idx])
+            last_cycles_data["right_power"].append(right_power[start_idx:end_idx])
+            last_cycles_data["total_power"].append(total_power[start_idx:end_idx])
 
         return last_cycles_data
 
@@ -189,140 +194,54 @@ class BayesianOptimizationWorker:
     #     cost = total_left_power + total_right_power + 0.1 * (right_intensity + left_intensity)
     #     return float(cost)
 
-    def _biceps_r_cost(self, last_cycles_data: Dict[str, list[np.ndarray]], muscle_name: str) -> float:
-
-        power = []
-        for i_cycle in range(len(last_cycles_data["right_power"])):
-
-            # Angles
-            angles = last_cycles_data["angles"][i_cycle]
-            if np.any(angles < 0) or np.any(angles > 2*np.pi):
-                raise RuntimeError("Something went wrong with angle wrapping, angles should be in [0, 2pi]")
-
-            lower_bound = np.radians(CUTOFF_ANGLES["right"][0])
-            upper_bound = np.radians(CUTOFF_ANGLES["right"][1])
-            angles_in_range_indices = np.where(
-                np.logical_and(
-                    lower_bound < angles,
-                    angles < upper_bound,
-                )
-            )
-
-            if len(angles_in_range_indices) > 0:
-                angles_in_range_indices = angles_in_range_indices[0]
-                # print("biceps r", angles_in_range_indices.shape[0], " / ", angles.shape[0])
-
-            # Maximize power
-            right_power = last_cycles_data["right_power"][i_cycle][angles_in_range_indices]
-            power += [-np.sum(right_power ** 2)]
-
-        # Minimize stimulation intensity
-        intensity = self.worker_stim.controller.intensity[muscle_name] ** 2
-
-        cost = 3*np.median(np.array(power)) + 0.05 * intensity
-        # print("biceps r cost:", cost)
-        return float(cost)
-
-    def _triceps_r_cost(self, last_cycles_data: Dict[str, list[np.ndarray]], muscle_name: str) -> float:
-
-        power = []
-        for i_cycle in range(len(last_cycles_data["right_power"])):
-            # Angles
-            angles = last_cycles_data["angles"][i_cycle]
-            if np.any(angles < 0) or np.any(angles > 2 * np.pi):
-                raise RuntimeError("Something went wrong with angle wrapping, angles should be in [0, 2pi]")
-
-            lower_bound = np.radians(CUTOFF_ANGLES["right"][1])
-            upper_bound = np.radians(CUTOFF_ANGLES["right"][0])
-            angles_in_range_indices = np.where(
-                np.logical_not(
-                    np.logical_and(
-                        angles < lower_bound,
-                        upper_bound < angles,
-                    )
-                )
-            )
-
-            if len(angles_in_range_indices) > 0:
-                angles_in_range_indices = angles_in_range_indices[0]
-                # print("triceps r", angles_in_range_indices.shape[0], " / ", angles.shape[0])
-
-            # Maximize power
-            right_power = last_cycles_data["right_power"][i_cycle][angles_in_range_indices]
-            power += [-np.sum(right_power ** 2)]
-
-        # Minimize stimulation intensity
-        intensity = self.worker_stim.controller.intensity[muscle_name] ** 2
-
-        cost = 3 * np.median(np.array(power)) + 0.05 * intensity
-        # print("triceps r cost:", cost)
-        return float(cost)
-
-    def _biceps_l_cost(self, last_cycles_data: Dict[str, list[np.ndarray]], muscle_name: str) -> float:
-
-        power = []
-        for i_cycle in range(len(last_cycles_data["left_power"])):
-            # Angles
-            angles = last_cycles_data["angles"][i_cycle]
-            if np.any(angles < 0) or np.any(angles > 2 * np.pi):
-                raise RuntimeError("Something went wrong with angle wrapping, angles should be in [0, 2pi]")
-            lower_bound = np.radians(CUTOFF_ANGLES["left"][1])
-            upper_bound = np.radians(CUTOFF_ANGLES["left"][0])
-            angles_in_range_indices = np.where(
-                np.logical_not(
-                    np.logical_and(
-                        angles < lower_bound,
-                        upper_bound < angles,
-                    )
-                )
-            )
-
-            if len(angles_in_range_indices) > 0:
-                angles_in_range_indices = angles_in_range_indices[0]
-                # print("biceps l", angles_in_range_indices.shape[0], " / ", angles.shape[0])
+    def _concatenate_cycles(self, last_cycles_data: Dict[str, list[np.ndarray]]) -> Dict[str, np.ndarray]:
+        """
+        Concatenate the cycles once for all the cost functions and check the angle wrapping.
+        cycle_starts holds the index of the first sample of each cycle in the concatenated arrays.
+        The returned arrays are views on a buffer reused at each iteration.
+        """
+        cycle_lengths = [cycle.shape[0] for cycle in last_cycles_data["angles"]]
+        nb_samples = sum(cycle_lengths)
+        if self._cycles_buffer.shape[1] < nb_samples:
+            self._cycles_buffer = np.empty((3, nb_samples), dtype=self.cycles_dtype)
+
+        angles = np.concatenate(last_cycles_data["angles"], out=self._cycles_buffer[0, :nb_samples])
+        # Compared in the buffer precision, valid angles just below 2pi can round up to 2pi when cast to float32
+        if np.any(angles < 0) or np.any(angles > self.cycles_dtype(2 * np.pi)):
+            raise RuntimeError("Something went wrong with angle wrapping, angles should be in [0, 2pi]")
+
+        return {
+            "angles": angles,
+            "left_power": np.concatenate(last_cycles_data["left_power"], out=self._cycles_buffer[1, :nb_samples]),
+            "right_power": np.concatenate(last_cycles_data["right_power"], out=self._cycles_buffer[2, :nb_samples]),
+            "cycle_starts": np.cumsum([0] + cycle_lengths[:-1]),
+        }
 
-            # Maximize power
-            left_power = last_cycles_data["left_power"][i_cycle][angles_in_range_indices]
-            power += [-np.sum(left_power ** 2)]
+    def _muscle_costs(self, cycles_data: Dict[str, np.ndarray], intensities: np.ndarray) -> np.ndarray:
+        """
+        Cost of each muscle: the power produced in the angle range of this muscle against the stimulation intensity.
+        The costs of all the muscles are computed together, row i corresponding to muscle_keys[i].
 
-        # Minimize stimulation intensity
-        intensity = self.worker_stim.controller.intensity[muscle_name] ** 2
-
-        cost = 3 * np.median(np.array(power)) + 0.05 * intensity
-        # print("biceps l cost:", cost)
-        return float(cost)
-
-    def _triceps_l_cost(self, last_cycles_data: Dict[str, list[np.ndarray]], muscle_name: str) -> float:
-
-        power = []
-        for i_cycle in range(len(last_cycles_data["left_power"])):
-            # Angles
-            angles = last_cycles_data["angles"][i_cycle]
-            if np.any(angles < 0) or np.any(angles > 2 * np.pi):
-                raise RuntimeError("Something went wrong with angle wrapping, angles should be in [0, 2pi]")
-
-            lower_bound = np.radians(CUTOFF_ANGLES["left"][0])
-            upper_bound = np.radians(CUTOFF_ANGLES["left"][1])
-            angles_in_range_indices = np.where(
-                np.logical_and(
-                    lower_bound < angles,
-                    angles < upper_bound,
-                )
-            )
-            if len(angles_in_range_indices) > 0:
-                angles_in_range_indices = angles_in_range_indices[0]
-                # print("triceps l", angles_in_range_indices.shape[0], " / ", angles.shape[0])
+        Parameters
+        ----------
+        cycles_data: The concatenated cycles (see _concatenate_cycles)
+        intensities: The stimulation intensity of each muscle during these cycles
+        """
+        angles = cycles_data["angles"]
+        angles_in_range = np.logical_and(
+            self._cost_bounds[:, 0:1] < angles,
+            angles < self._cost_bounds[:, 1:2],
+        )
+        # Flip the ranges that are outside the cutoff angles
+        angles_in_range ^= self._cost_outside[:, np.newaxis]
 
-            # Maximize power
-            left_power = last_cycles_data["left_power"][i_cycle][angles_in_range_indices]
-            power += [-np.sum(left_power ** 2)]
+        # Maximize power (sum of the squared power in range for each cycle)
+        power = np.stack([cycles_data[f"{side}_power"] for side in self._cost_sides])
+        squared_power = np.multiply(power, power, out=np.zeros_like(power), where=angles_in_range)
+        power = -np.add.reduceat(squared_power, cycles_data["cycle_starts"], axis=1, dtype=np.float64)
 
         # Minimize stimulation intensity
-        intensity = self.worker_stim.controller.intensity[muscle_name] ** 2
-
-        cost = 3 * np.array(np.median(power)) + 0.05 * intensity
-        # print("triceps l cost:", cost)
-        return float(cost)
+        return 3 * np.median(power, axis=1) + 0.05 * intensities * intensities
 
     # This is retired code to be used with gp_minimize
     # def _objective(self, x: List[float]) -> float:
@@ -374,24 +293,34 @@ class BayesianOptimizationWorker:
         self.worker_stim.controller.apply_parameters(parameters, self.really_change_stim_intensity)
         self._logger.info(f"Applied new stimulation parameters.")
 
+        # Snapshot the intensities applied for this evaluation
+        intensity = self.worker_stim.controller.intensity
+        intensities = np.fromiter(
+            (intensity[muscle] for muscle in self.muscle_mode.muscle_keys),
+            dtype=np.float64,
+            count=len(self.muscle_mode.muscle_keys),
+        )
+
         # Clear the data collector buffer to start fresh
-        self.worker_pedal.data_collector.clear()
+        self.worker_pedal.clear_data()
 
-        # Wait until a few cycles have been collected
-        while self.get_num_cycles() < self.nb_cycles_to_run:
-            time.sleep(0.1)
+        # Wait until a few cycles have been collected (the pedal worker counts them as the data arrives)
+        if not self.worker_pedal.wait_for_cycles(self.nb_cycles_to_run):
+            raise RuntimeError("The pedal worker stopped before the required number of cycles was collected.")
         self._logger.info(f"Required number of cycles collected.")
 
         # Get cost value
         last_cycles_data = self.get_last_cycles_data()
-        cost_list = []
-        for muscle in self.muscle_mode.muscle_keys:
-            cost = self.cost_function[muscle](last_cycles_data, muscle)
-            cost_list += [cost]
+        cycles_data = self._concatenate_cycles(last_cycles_data)
+        cost_list = self._muscle_costs(cycles_data, intensities).tolist()
 
-            # Update results and live plotter
+        # Update results and live plotter
+        for muscle, cost in zip(self.muscle_mode.muscle_keys, cost_list):
             self.cost_dict[muscle].append(cost)
         self.parameter_list.append(params)
+        if self._log_file is not None:
+            self._log_file.write(json.dumps({"x": [float(value) for value in x], "costs": cost_list}) + "\n")
+            self._log_file.flush()
         if self.worker_plot is not None:
             self.worker_plot.update_data(self.cost_dict, self.parameter_list)
 
@@ -406,6 +335,7 @@ class BayesianOptimizationWorker:
             "best_cost": [self.best_result_dict[muscle] for muscle in self.muscle_mode.muscle_keys],
             "cost_list": self.cost_dict,
             "parameter_list": self.parameter_list,
+            "log_file_name": self.log_file_name,
         }
         file_name = f"bo_results_{self.muscle_mode.value}.pkl"
         with open(file_name, "wb") as f:
@@ -435,12 +365,21 @@ class BayesianOptimizationWorker:
             muscle_mode=self.muscle_mode,
             xi=0.01,
             length_scale=1.0,
+            bounds=self.bounds,
         )
-        self.best_result_dict = bayesian_optimizer.optimize(
-            n_iterations=self.n_iterations,
-            nb_init_intensity_increasing_steps=self.nb_init_intensity_increasing_steps,
-        )
+        try:
+            with open(self.log_file_name, "w") as log_file:
+                self._log_file = log_file
+                self.best_result_dict = bayesian_optimizer.optimize(
+                    n_iterations=self.n_iterations,
+                    nb_init_intensity_increasing_steps=self.nb_init_intensity_increasing_steps,
+                    batch_size=self.batch_size,
+                )
 
-        self._logger.info(f"Optimization finished.")
-        self.save_results()
-        self.worker_stim.stop()
+            self._logger.info(f"Optimization finished.")
+            self.save_results()
+        finally:
+            # The iterations are not logged anymore once the file is closed
+            self._log_file = None
+            # Also stop the stimulation if the optimization was aborted (e.g. the pedal worker stopped)
+            self.worker_stim.stop()
@@ -1,13 +1,26 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Dict
+from operator import itemgetter
 from enum import Enum
 
-from constants import STIMULATION_RANGE
+import numpy as np
+
+from constants import STIMULATION_MUSCLES, STIMULATION_OFFSETS
 
 
 class StimParameters:
+    """
+    Stimulation parameters of all the muscles.
+    The values are stored in one contiguous vector, in the order of _FIELDS, and each one is accessible by its name.
+    """
+
+    # Onset, offset and intensity of each muscle, in the order of STIMULATION_MUSCLES like STIMULATION_OFFSETS
+    _FIELDS = tuple(
+        f"{name}_{muscle}" for muscle in STIMULATION_MUSCLES for name in ("onset_deg", "offset_deg", "pulse_intensity")
+    )
+    _IDX = {name: i for i, name in enumerate(_FIELDS)}
+    # No per-instance __dict__, the only attribute is the parameter vector
+    __slots__ = ("_v",)
 
     def __init__(
             self,
@@ -37,250 +50,205 @@ class StimParameters:
             pulse_intensity_delt_ant_l: float = 0,
         ):
 
-            # Right biceps
-            self.onset_deg_biceps_r = onset_deg_biceps_r
-            self.offset_deg_biceps_r = offset_deg_biceps_r
-            self.pulse_intensity_biceps_r = pulse_intensity_biceps_r
-
-            # Right triceps
-            self.onset_deg_triceps_r = onset_deg_triceps_r
-            self.offset_deg_triceps_r = offset_deg_triceps_r
-            self.pulse_intensity_triceps_r = pulse_intensity_triceps_r
-
-            # Left biceps
-            self.onset_deg_biceps_l = onset_deg_biceps_l
-            self.offset_deg_biceps_l = offset_deg_biceps_l
-            self.pulse_intensity_biceps_l = pulse_intensity_biceps_l
-
-            # Left triceps
-            self.onset_deg_triceps_l = onset_deg_triceps_l
-            self.offset_deg_triceps_l = offset_deg_triceps_l
-            self.pulse_intensity_triceps_l = pulse_intensity_triceps_l
-
-            # Right posterior deltoid
-            self.onset_deg_delt_post_r = onset_deg_delt_post_r
-            self.offset_deg_delt_post_r = offset_deg_delt_post_r
-            self.pulse_intensity_delt_post_r = pulse_intensity_delt_post_r
-
-            # Right deltoid anterior
-            self.onset_deg_delt_ant_r = onset_deg_delt_ant_r
-            self.offset_deg_delt_ant_r = offset_deg_delt_ant_r
-            self.pulse_intensity_delt_ant_r = pulse_intensity_delt_ant_r
-
-            # Left posterior deltoid
-            self.onset_deg_delt_post_l = onset_deg_delt_post_l
-            self.offset_deg_delt_post_l = offset_deg_delt_post_l
-            self.pulse_intensity_delt_post_l = pulse_intensity_delt_post_l
-
-            # Left deltoid anterior
-            self.onset_deg_delt_ant_l = onset_deg_delt_ant_l
-            self.offset_deg_delt_ant_l = offset_deg_delt_ant_l
-            self.pulse_intensity_delt_ant_l = pulse_intensity_delt_ant_l
+            self._v = np.array(
+                [
+                    # Right biceps
+                    onset_deg_biceps_r,
+                    offset_deg_biceps_r,
+                    pulse_intensity_biceps_r,
+                    # Right triceps
+                    onset_deg_triceps_r,
+                    offset_deg_triceps_r,
+                    pulse_intensity_triceps_r,
+                    # Left biceps
+                    onset_deg_biceps_l,
+                    offset_deg_biceps_l,
+                    pulse_intensity_biceps_l,
+                    # Left triceps
+                    onset_deg_triceps_l,
+                    offset_deg_triceps_l,
+                    pulse_intensity_triceps_l,
+                    # Right posterior deltoid
+                    onset_deg_delt_post_r,
+                    offset_deg_delt_post_r,
+                    pulse_intensity_delt_post_r,
+                    # Right deltoid anterior
+                    onset_deg_delt_ant_r,
+                    offset_deg_delt_ant_r,
+                    pulse_intensity_delt_ant_r,
+                    # Left posterior deltoid
+                    onset_deg_delt_post_l,
+                    offset_deg_delt_post_l,
+                    pulse_intensity_delt_post_l,
+                    # Left deltoid anterior
+                    onset_deg_delt_ant_l,
+                    offset_deg_delt_ant_l,
+                    pulse_intensity_delt_ant_l,
+                ],
+                dtype=np.float64,
+            )
+
+    @classmethod
+    def _from_vector(cls, v: np.ndarray) -> StimParameters:
+        """Wrap an existing vector of 24 parameters (ordered as _FIELDS) without copying it."""
+        parameters = cls.__new__(cls)
+        parameters._v = v
+        return parameters
+
+    def __getstate__(self) -> dict:
+        return {"_v": self._v}
+
+    def __setstate__(self, state: dict):
+        # Results pickled before the parameters were stored as a vector hold one attribute per parameter
+        if "_v" not in state:
+            state = {"_v": np.array([state[name] for name in self._FIELDS], dtype=np.float64)}
+        self._v = state["_v"]
 
     @classmethod
-    def from_flat_vector(self, x: List[float], muscle_mode: MuscleMode) -> "StimParameters":
+    def from_flat_vector(cls, x: list[float], muscle_mode: MuscleMode) -> "StimParameters":
         """
         Convert 16D BO vector to StimParameters instance.
         Order must match the search space in bo_worker.py.
         """
-        if isinstance(muscle_mode, MuscleMode.BICEPS_TRICEPS):
-            return StimParameters(
-                onset_deg_biceps_r=x[0],
-                offset_deg_biceps_r=x[1],
-                pulse_intensity_biceps_r=x[2],
-                onset_deg_triceps_r=x[3],
-                offset_deg_triceps_r=x[4],
-                pulse_intensity_triceps_r=x[5],
-                onset_deg_biceps_l=x[6],
-                offset_deg_biceps_l=x[7],
-                pulse_intensity_biceps_l=x[8],
-                onset_deg_triceps_l=x[9],
-                offset_deg_triceps_l=x[10],
-                pulse_intensity_triceps_l=x[11],
-            )
-        elif isinstance(muscle_mode, MuscleMode.DELTOIDS):
-            return StimParameters(
-                onset_deg_delt_post_r=x[0],
-                offset_deg_delt_post_r=x[1],
-                pulse_intensity_delt_post_r=x[2],
-                onset_deg_delt_ant_r=x[3],
-                offset_deg_delt_ant_r=x[4],
-                pulse_intensity_delt_ant_r=x[5],
-                onset_deg_delt_post_l=x[6],
-                offset_deg_delt_post_l=x[7],
-                pulse_intensity_delt_post_l=x[8],
-                onset_deg_delt_ant_l=x[9],
-                offset_deg_delt_ant_l=x[10],
-                pulse_intensity_delt_ant_l=x[11],
-            )
-        elif isinstance(muscle_mode, MuscleMode.BOTH):
-            return StimParameters(
-                onset_deg_biceps_r=x[0],
-                offset_deg_biceps_r=x[1],
-                pulse_intensity_biceps_r=x[2],
-                onset_deg_triceps_r=x[3],
-                offset_deg_triceps_r=x[4],
-                pulse_intensity_triceps_r=x[5],
-                onset_deg_biceps_l=x[6],
-                offset_deg_biceps_l=x[7],
-                pulse_intensity_biceps_l=x[8],
-                onset_deg_triceps_l=x[9],
-                offset_deg_triceps_l=x[10],
-                pulse_intensity_triceps_l=x[11],
-                onset_deg_delt_post_r=x[12],
-                offset_deg_delt_post_r=x[13],
-                pulse_intensity_delt_post_r=x[14],
-                onset_deg_delt_ant_r=x[15],
-                offset_deg_delt_ant_r=x[16],
-                pulse_intensity_delt_ant_r=x[17],
-                onset_deg_delt_post_l=x[18],
-                offset_deg_delt_post_l=x[19],
-                pulse_intensity_delt_post_l=x[20],
-                onset_deg_delt_ant_l=x[21],
-                offset_deg_delt_ant_l=x[22],
-                pulse_intensity_delt_ant_l=x[23],
-            )
-        else:
+        if muscle_mode not in _MODE_INDICES:
             raise ValueError(f"Invalid muscle mode : {muscle_mode}")
+        # The parameters of the muscles that are not optimized in this mode stay at 0
+        v = np.zeros(len(cls._FIELDS))
+        v[_MODE_INDICES[muscle_mode]] = x
+        return cls._from_vector(v)
 
     @classmethod
-    def from_dict(cls, param_dict: Dict[str, float]) -> "StimParameters":
+    def from_flat_batch(cls, x: np.ndarray, muscle_mode: MuscleMode) -> np.ndarray:
+        """
+        Convert a batch of BO vectors (n_points, n_bo_params) to parameter vectors (n_points, 24) without creating any
+        StimParameters instance. The result can be passed to add_angles_offset_batch.
+        """
+        if muscle_mode not in _MODE_INDICES:
+            raise ValueError(f"Invalid muscle mode : {muscle_mode}")
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim != 2 or x.shape[1] != _MODE_INDICES[muscle_mode].shape[0]:
+            raise ValueError(
+                f"x must be of shape (n_points, {_MODE_INDICES[muscle_mode].shape[0]}) for {muscle_mode}, got {x.shape}"
+            )
+        v = np.zeros((x.shape[0], len(cls._FIELDS)))
+        v[:, _MODE_INDICES[muscle_mode]] = x
+        return v
+
+    @classmethod
+    def from_dict(cls, param_dict: dict[str, float]) -> "StimParameters":
         """
         Convert dictionary to StimParameters instance.
         """
-        return cls(
-            onset_deg_biceps_r=param_dict["onset_deg_biceps_r"],
-            offset_deg_biceps_r=param_dict["offset_deg_biceps_r"],
-            pulse_intensity_biceps_r=param_dict["pulse_intensity_biceps_r"],
-            onset_deg_triceps_r=param_dict["onset_deg_triceps_r"],
-            offset_deg_triceps_r=param_dict["offset_deg_triceps_r"],
-            pulse_intensity_triceps_r=param_dict["pulse_intensity_triceps_r"],
-            onset_deg_biceps_l=param_dict["onset_deg_biceps_l"],
-            offset_deg_biceps_l=param_dict["offset_deg_biceps_l"],
-            pulse_intensity_biceps_l=param_dict["pulse_intensity_biceps_l"],
-            onset_deg_triceps_l=param_dict["onset_deg_triceps_l"],
-            offset_deg_triceps_l=param_dict["offset_deg_triceps_l"],
-            pulse_intensity_triceps_l=param_dict["pulse_intensity_triceps_l"],
-            onset_deg_delt_post_r=param_dict["onset_deg_delt_post_r"],
-            offset_deg_delt_post_r=param_dict["offset_deg_delt_post_r"],
-            pulse_intensity_delt_post_r=param_dict["pulse_intensity_delt_post_r"],
-            onset_deg_delt_ant_r=param_dict["onset_deg_delt_ant_r"],
-            offset_deg_delt_ant_r=param_dict["offset_deg_delt_ant_r"],
-            pulse_intensity_delt_ant_r=param_dict["pulse_intensity_delt_ant_r"],
-            onset_deg_delt_post_l=param_dict["onset_deg_delt_post_l"],
-            offset_deg_delt_post_l=param_dict["offset_deg_delt_post_l"],
-            pulse_intensity_delt_post_l=param_dict["pulse_intensity_delt_post_l"],
-            onset_deg_delt_ant_l=param_dict["onset_deg_delt_ant_l"],
-            offset_deg_delt_ant_l=param_dict["offset_deg_delt_ant_l"],
-            pulse_intensity_delt_ant_l=param_dict["pulse_intensity_delt_ant_l"],
+        return cls._from_vector(
+            np.fromiter(_FROM_DICT_GETTER(param_dict), dtype=np.float64, count=len(cls._FIELDS))
         )
 
-    def to_flat_vector(self) -> List[float]:
+    def to_flat_vector(self) -> list[float]:
         """
         Convert back to a flat list if needed.
         """
-        return [
-            self.onset_deg_biceps_r,
-            self.offset_deg_biceps_r,
-            self.pulse_intensity_biceps_r,
-            self.onset_deg_triceps_r,
-            self.offset_deg_triceps_r,
-            self.pulse_intensity_triceps_r,
-            self.onset_deg_biceps_l,
-            self.offset_deg_biceps_l,
-            self.pulse_intensity_biceps_l,
-            self.onset_deg_triceps_l,
-            self.offset_deg_triceps_l,
-            self.pulse_intensity_triceps_l,
-            self.onset_deg_delt_post_r,
-            self.offset_deg_delt_post_r,
-            self.pulse_intensity_delt_post_r,
-            self.onset_deg_delt_ant_r,
-            self.offset_deg_delt_ant_r,
-            self.pulse_intensity_delt_ant_r,
-            self.onset_deg_delt_post_l,
-            self.offset_deg_delt_post_l,
-            self.pulse_intensity_delt_post_l,
-            self.onset_deg_delt_ant_l,
-            self.offset_deg_delt_ant_l,
-            self.pulse_intensity_delt_ant_l,
-        ]
+        return self._v.tolist()
 
-    def add_angles_offset(self) -> StimParameters:
+    def add_angles_offset(self, out: StimParameters | None = None) -> StimParameters:
         """
         Return a new StimParameters instance with an offset added to all angle parameters.
+        If out is given, its values are overwritten instead and it is returned, so that no new instance is created.
         """
-        def mod_angle(angle: float) -> float:
-            """Ensure angle is within [0, 360) degrees."""
-            if angle < 0:
-                return angle + 360
-            elif angle >= 360:
-                return angle % 360
-            else:
-                return angle
-
-        return StimParameters(
-            onset_deg_biceps_r=mod_angle(self.onset_deg_biceps_r + STIMULATION_RANGE["biceps_r"][0]),
-            offset_deg_biceps_r=mod_angle(self.offset_deg_biceps_r + STIMULATION_RANGE["biceps_r"][1]),
-            pulse_intensity_biceps_r=self.pulse_intensity_biceps_r,
-            onset_deg_triceps_r=mod_angle(self.onset_deg_triceps_r + STIMULATION_RANGE["triceps_r"][0]),
-            offset_deg_triceps_r=mod_angle(self.offset_deg_triceps_r + STIMULATION_RANGE["triceps_r"][1]),
-            pulse_intensity_triceps_r=self.pulse_intensity_triceps_r,
-            onset_deg_biceps_l=mod_angle(self.onset_deg_biceps_l + STIMULATION_RANGE["biceps_l"][0]),
-            offset_deg_biceps_l=mod_angle(self.offset_deg_biceps_l + STIMULATION_RANGE["biceps_l"][1]),
-            pulse_intensity_biceps_l=self.pulse_intensity_biceps_l,
-            onset_deg_triceps_l=mod_angle(self.onset_deg_triceps_l + STIMULATION_RANGE["triceps_l"][0]),
-            offset_deg_triceps_l=mod_angle(self.offset_deg_triceps_l + STIMULATION_RANGE["triceps_l"][1]),
-            pulse_intensity_triceps_l=self.pulse_intensity_triceps_l,
-            onset_deg_delt_post_r=mod_angle(self.onset_deg_delt_post_r + STIMULATION_RANGE["delt_post_r"][0]),
-            offset_deg_delt_post_r=mod_angle(self.offset_deg_delt_post_r + STIMULATION_RANGE["delt_post_r"][1]),
-            pulse_intensity_delt_post_r=self.pulse_intensity_delt_post_r,
-            onset_deg_delt_ant_r=mod_angle(self.onset_deg_delt_ant_r + STIMULATION_RANGE["delt_ant_r"][0]),
-            offset_deg_delt_ant_r=mod_angle(self.offset_deg_delt_ant_r + STIMULATION_RANGE["delt_ant_r"][1]),
-            pulse_intensity_delt_ant_r=self.pulse_intensity_delt_ant_r,
-            onset_deg_delt_post_l=mod_angle(self.onset_deg_delt_post_l + STIMULATION_RANGE["delt_post_l"][0]),
-            offset_deg_delt_post_l=mod_angle(self.offset_deg_delt_post_l + STIMULATION_RANGE["delt_post_l"][1]),
-            pulse_intensity_delt_post_l=self.pulse_intensity_delt_post_l,
-            onset_deg_delt_ant_l=mod_angle(self.onset_deg_delt_ant_l + STIMULATION_RANGE["delt_ant_l"][0]),
-            offset_deg_delt_ant_l=mod_angle(self.offset_deg_delt_ant_l + STIMULATION_RANGE["delt_ant_l"][1]),
-            pulse_intensity_delt_ant_l=self.pulse_intensity_delt_ant_l,
-        )
-
-class MuscleMode:
-
-    class BICEPS_TRICEPS:
-        def __init__(self):
-            self.value = "biceps_triceps"
-            self.muscle_keys = (
-                "biceps_r",   # Channel 1
-                "triceps_r",  # Channel 2
-                "biceps_l",   # Channel 3
-                "triceps_l",  # Channel 4
-            )
-            self.channel_indices = [1, 2, 3, 4]
-
-    class DELTOIDS:
-        def __init__(self):
-            self.value = "deltoids"
-            self.muscle_keys = (
-                "delt_post_r",  # Channel 5
-                "delt_ant_r",   # Channel 6
-                "delt_post_l",  # Channel 7
-                "delt_ant_l",   # Channel 8
-            )
-            self.channel_indices = [5, 6, 7, 8]
-
-    class BOTH:
-        def __init__(self):
-            self.value = "both"
-            self.muscle_keys = (
-                "biceps_r",    # Channel 1
-                "triceps_r",   # Channel 2
-                "biceps_l",    # Channel 3
-                "triceps_l",   # Channel 4
-                "delt_post_r", # Channel 5
-                "delt_ant_r",  # Channel 6
-                "delt_post_l", # Channel 7
-                "delt_ant_l",  # Channel 8
-            )
-            self.channel_indices = [1, 2, 3, 4, 5, 6, 7, 8]
\ No newline at end of file
+        if out is None:
+            return StimParameters._from_vector(add_angles_offset_batch(self._v))
+        add_angles_offset_batch(self._v, out=out._v)
+        return out
+
+
+def add_angles_offset_batch(v: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Add the stimulation range offsets to the angles of a batch of parameter vectors (..., 24).
+    The angles are wrapped to [0, 360) degrees, the intensities are left as they are.
+    The result is written in out when it is given.
+    """
+    new_v = np.add(v, STIMULATION_OFFSETS, out=out)
+    np.mod(new_v, 360, out=new_v, where=_IS_ANGLE)
+    return new_v
+
+
+def _parameter_property(index: int) -> property:
+    """Named access to one element of the StimParameters vector."""
+
+    def getter(self: StimParameters) -> float:
+        return self._v[index]
+
+    def setter(self: StimParameters, value: float) -> None:
+        self._v[index] = value
+
+    return property(getter, setter)
+
+
+for _index, _name in enumerate(StimParameters._FIELDS):
+    setattr(StimParameters, _name, _parameter_property(_index))
+
+# Fetch all the parameters of a dictionary at once, in the order of the parameter vector
+_FROM_DICT_GETTER = itemgetter(*StimParameters._FIELDS)
+
+# Parameters wrapped to [0, 360) degrees by add_angles_offset
+_IS_ANGLE = np.array([not name.startswith("pulse_intensity") for name in StimParameters._FIELDS])
+
+
+class MuscleMode(Enum):
+    """
+    Group of muscles that is stimulated. The value is used in the name of the result files.
+    """
+
+    BICEPS_TRICEPS = "biceps_triceps"
+    DELTOIDS = "deltoids"
+    BOTH = "both"
+
+    @property
+    def muscle_keys(self) -> tuple[str, ...]:
+        return _MUSCLE_KEYS[self]
+
+    @property
+    def channel_indices(self) -> tuple[int, ...]:
+        return _CHANNEL_INDICES[self]
+
+
+_MUSCLE_KEYS = {
+    MuscleMode.BICEPS_TRICEPS: (
+        "biceps_r",   # Channel 1
+        "triceps_r",  # Channel 2
+        "biceps_l",   # Channel 3
+        "triceps_l",  # Channel 4
+    ),
+    MuscleMode.DELTOIDS: (
+        "delt_post_r",  # Channel 5
+        "delt_ant_r",   # Channel 6
+        "delt_post_l",  # Channel 7
+        "delt_ant_l",   # Channel 8
+    ),
+    MuscleMode.BOTH: (
+        "biceps_r",    # Channel 1
+        "triceps_r",   # Channel 2
+        "biceps_l",    # Channel 3
+        "triceps_l",   # Channel 4
+        "delt_post_r", # Channel 5
+        "delt_ant_r",  # Channel 6
+        "delt_post_l", # Channel 7
+        "delt_ant_l",  # Channel 8
+    ),
+}
+_CHANNEL_INDICES = {
+    MuscleMode.BICEPS_TRICEPS: (1, 2, 3, 4),
+    MuscleMode.DELTOIDS: (5, 6, 7, 8),
+    MuscleMode.BOTH: (1, 2, 3, 4, 5, 6, 7, 8),
+}
+
+# Position in the StimParameters vector of each element of the BO vector of a muscle mode
+_MODE_INDICES = {
+    muscle_mode: np.array(
+        [
+            StimParameters._IDX[f"{parameter}_{muscle}"]
+            for muscle in muscle_mode.muscle_keys
+            for parameter in ("onset_deg", "offset_deg", "pulse_intensity")
+        ]
+    )
+    for muscle_mode in MuscleMode
+}
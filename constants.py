@@ -1,16 +1,36 @@
+from types import MappingProxyType
+
+import numpy as np
 
 
 # Zero = left hand in front
-STIMULATION_RANGE = {
-    "biceps_r": [130, 280],  # TOBECHANGED
-    "triceps_r": [290, 90],  # TOBECHANGED
-    "biceps_l": [310, 100],  # TOBECHANGED
-    "triceps_l": [110, 270],  # TOBECHANGED
-    "delt_post_r": [130, 280],  # TOBECHANGED
-    "delt_ant_r": [290, 90],  # TOBECHANGED
-    "delt_post_l": [310, 100],  # TOBECHANGED
-    "delt_ant_l": [110, 270],  # TOBECHANGED
-}
+STIMULATION_RANGE = MappingProxyType({
+    "biceps_r": (130, 280),  # TOBECHANGED
+    "triceps_r": (290, 90),  # TOBECHANGED
+    "biceps_l": (310, 100),  # TOBECHANGED
+    "triceps_l": (110, 270),  # TOBECHANGED
+    "delt_post_r": (130, 280),  # TOBECHANGED
+    "delt_ant_r": (290, 90),  # TOBECHANGED
+    "delt_post_l": (310, 100),  # TOBECHANGED
+    "delt_ant_l": (110, 270),  # TOBECHANGED
+})
+# Order of the muscles in the stimulation parameter vector (StimParameters._FIELDS is built from it)
+STIMULATION_MUSCLES = (
+    "biceps_r",
+    "triceps_r",
+    "biceps_l",
+    "triceps_l",
+    "delt_post_r",
+    "delt_ant_r",
+    "delt_post_l",
+    "delt_ant_l",
+)
+# Offset of each stimulation parameter, in the order of StimParameters._FIELDS (onset, offset and intensity of each
+# muscle of STIMULATION_MUSCLES): the onsets and offsets are relative to the stimulation range, the intensities are not
+STIMULATION_OFFSETS = np.array(
+    [[*STIMULATION_RANGE[muscle], 0.0] for muscle in STIMULATION_MUSCLES], dtype=np.float64
+).ravel()
+STIMULATION_OFFSETS.flags.writeable = False
 CUTOFF_ANGLES = {
     "right": [110, 285],  # In degrees (biceps_r is in this range)  # TOBECHANGED
     "left": [105, 290],   # In degrees (triceps_l is in this range)  # TOBECHANGED
@@ -37,44 +57,37 @@ def wrap_angle(angle):
     return angle % 360
 
 
-def get_bounds_for_muscle(muscle1_name, muscle2_name, default_min_angle=30, default_max_angle=30):
-    global STIMULATION_RANGE
-
-    # Check overlap between muscle1's onset and muscle2's offset
-    muscle1_onset_min = wrap_angle(STIMULATION_RANGE[muscle1_name][0] - default_min_angle)
-    muscle2_offset_max = wrap_angle(STIMULATION_RANGE[muscle2_name][1] + default_max_angle)
-
-    if smaller_than_angle(muscle1_onset_min, muscle2_offset_max):
-        # They overlap, find the midpoint
-        m_angle = mean_angle(STIMULATION_RANGE[muscle1_name][0], STIMULATION_RANGE[muscle2_name][1])
-        # Calculate the distance from base angles to midpoint
-        muscle1_min_onset = angular_distance(STIMULATION_RANGE[muscle1_name][0], m_angle)
-        muscle2_max_offset = angular_distance(STIMULATION_RANGE[muscle2_name][1], m_angle)
-    else:
-        # No overlap, use default ranges
-        muscle1_min_onset = -default_min_angle
-        muscle2_max_offset = default_max_angle
+def _onset_offset_bounds(onset, offset, default_min_angle, default_max_angle):
+    """
+    Returns the lower bound of the onset of a muscle and the upper bound of the offset of the muscle stimulated just
+    before it, relative to their base angles.
+    """
+    # The widened ranges overlap if the latest offset comes at most half a turn after the earliest onset
+    if (offset + default_max_angle - (onset - default_min_angle)) % 360 <= 180:
+        # They overlap, both bounds stop at the midpoint which is half the distance away from each base angle
+        half_distance = angular_distance(onset, offset) / 2
+        return half_distance, -half_distance
+    # No overlap, use default ranges
+    return -default_min_angle, default_max_angle
 
-    muscle1_max_onset = default_max_angle
-    muscle2_min_offset = -default_min_angle
 
-    # Check overlap between muscle2's onset and muscle1's offset
-    muscle2_onset_min = wrap_angle(STIMULATION_RANGE[muscle2_name][0] - default_min_angle)
-    muscle1_offset_max = wrap_angle(STIMULATION_RANGE[muscle1_name][1] + default_max_angle)
-
-    if smaller_than_angle(muscle2_onset_min, muscle1_offset_max):
-        # They overlap, find the midpoint
-        m_angle = mean_angle(STIMULATION_RANGE[muscle2_name][0], STIMULATION_RANGE[muscle1_name][1])
-        # Calculate the distance from base angles to midpoint
-        muscle2_min_onset = angular_distance(STIMULATION_RANGE[muscle2_name][0], m_angle)
-        muscle1_max_offset = angular_distance(STIMULATION_RANGE[muscle1_name][1], m_angle)
-    else:
-        # No overlap, use default ranges
-        muscle2_min_onset = -default_min_angle
-        muscle1_max_offset = default_max_angle
+def get_bounds_for_muscle(muscle1_name, muscle2_name, default_min_angle=30, default_max_angle=30):
+    muscle1_onset, muscle1_offset = STIMULATION_RANGE[muscle1_name]
+    muscle2_onset, muscle2_offset = STIMULATION_RANGE[muscle2_name]
 
-    muscle2_max_onset = default_max_angle
+    # Overlap between muscle1's onset and muscle2's offset
+    muscle1_min_onset, muscle2_max_offset = _onset_offset_bounds(
+        muscle1_onset, muscle2_offset, default_min_angle, default_max_angle
+    )
+    # Overlap between muscle2's onset and muscle1's offset
+    muscle2_min_onset, muscle1_max_offset = _onset_offset_bounds(
+        muscle2_onset, muscle1_offset, default_min_angle, default_max_angle
+    )
+
+    muscle1_max_onset = default_max_angle
     muscle1_min_offset = -default_min_angle
+    muscle2_max_onset = default_max_angle
+    muscle2_min_offset = -default_min_angle
 
     return (
         muscle1_min_onset,
@@ -87,96 +100,48 @@ def get_bounds_for_muscle(muscle1_name, muscle2_name, default_min_angle=30, defa
         muscle2_max_offset,
     )
 
+# Muscles stimulated one after the other, the bounds of their onsets and offsets are computed together
+MUSCLE_PAIRS = (
+    ("biceps_r", "triceps_r"),
+    ("biceps_l", "triceps_l"),
+    ("delt_post_r", "delt_ant_r"),
+    ("delt_post_l", "delt_ant_l"),
+)
+PULSE_INTENSITY_BOUNDS = MappingProxyType({
+    "biceps_r": (6, 12),  # TOBECHANGED
+    "triceps_r": (4, 8),  # TOBECHANGED
+    "biceps_l": (6, 10),  # TOBECHANGED
+    "triceps_l": (4, 8),  # TOBECHANGED
+    "delt_post_r": (6, 10),  # TOBECHANGED
+    "delt_ant_r": (6, 10),  # TOBECHANGED
+    "delt_post_l": (6, 10),  # TOBECHANGED
+    "delt_ant_l": (6, 10),  # TOBECHANGED
+})
+
+
+def _muscle_bounds(muscle_name, min_onset, max_onset, min_offset, max_offset):
+    return MappingProxyType({
+        "onset_deg": (min_onset, max_onset),
+        "offset_deg": (min_offset, max_offset),
+        "pulse_intensity": PULSE_INTENSITY_BOUNDS[muscle_name],
+    })
+
+
 def set_param_bounds():
-    global STIMULATION_RANGE
-
-    (
-        biceps_r_min_onset,
-        biceps_r_max_onset,
-        biceps_r_min_offset,
-        biceps_r_max_offset,
-        triceps_r_min_onset,
-        triceps_r_max_onset,
-        triceps_r_min_offset,
-        triceps_r_max_offset,
-    ) = get_bounds_for_muscle("biceps_r", "triceps_r", default_min_angle=30, default_max_angle=30)
-
-    (
-        biceps_l_min_onset,
-        biceps_l_max_onset,
-        biceps_l_min_offset,
-        biceps_l_max_offset,
-        triceps_l_min_onset,
-        triceps_l_max_onset,
-        triceps_l_min_offset,
-        triceps_l_max_offset,
-    ) = get_bounds_for_muscle("biceps_l", "triceps_l", default_min_angle=30, default_max_angle=30)
-
-    (
-        delt_post_r_min_onset,
-        delt_post_r_max_onset,
-        delt_post_r_min_offset,
-        delt_post_r_max_offset,
-        delt_ant_r_min_onset,
-        delt_ant_r_max_onset,
-        delt_ant_r_min_offset,
-        delt_ant_r_max_offset,
-    ) = get_bounds_for_muscle("delt_post_r", "delt_ant_r", default_min_angle=30, default_max_angle=30)
-
-    (
-        delt_post_l_min_onset,
-        delt_post_l_max_onset,
-        delt_post_l_min_offset,
-        delt_post_l_max_offset,
-        delt_ant_l_min_onset,
-        delt_ant_l_max_onset,
-        delt_ant_l_min_offset,
-        delt_ant_l_max_offset,
-    ) = get_bounds_for_muscle("delt_post_l", "delt_ant_l", default_min_angle=30, default_max_angle=30)
-
-
-    PARAMS_BOUNDS = {
-        "biceps_r":{
-            "onset_deg": [biceps_r_min_onset, biceps_r_max_onset],
-            "offset_deg": [biceps_r_min_offset, biceps_r_max_offset],
-            "pulse_intensity": [6, 12],  # TOBECHANGED
-        },
-        "triceps_r": {
-            "onset_deg": [triceps_r_min_onset, triceps_r_max_onset],
-            "offset_deg": [triceps_r_min_offset, triceps_r_max_offset],
-            "pulse_intensity": [4, 8],  # TOBECHANGED
-        },
-        "biceps_l": {
-            "onset_deg": [biceps_l_min_onset, biceps_l_max_onset],
-            "offset_deg": [biceps_l_min_offset, biceps_l_max_offset],
-            "pulse_intensity": [6, 10],  # TOBECHANGED
-        },
-        "triceps_l": {
-            "onset_deg": [triceps_l_min_onset, triceps_l_max_onset],
-            "offset_deg": [triceps_l_min_offset, triceps_l_max_offset],
-            "pulse_intensity": [4, 8],  # TOBECHANGED
-        },
-        "delt_post_r": {
-            "onset_deg": [delt_post_r_min_onset, delt_post_r_max_onset],
-            "offset_deg": [delt_post_r_min_offset, delt_post_r_max_offset],
-            "pulse_intensity": [6, 10],  # TOBECHANGED
-        },
-        "delt_ant_r": {
-            "onset_deg": [delt_ant_r_min_onset, delt_ant_r_max_onset],
-            "offset_deg": [delt_ant_r_min_offset, delt_ant_r_max_offset],
-            "pulse_intensity": [6, 10],  # TOBECHANGED
-        },
-        "delt_post_l": {
-            "onset_deg": [delt_ant_l_min_onset, delt_ant_l_max_onset],
-            "offset_deg": [delt_ant_l_min_offset, delt_ant_l_max_offset],
-            "pulse_intensity": [6, 10],  # TOBECHANGED
-        },
-        "delt_ant_l": {
-            "onset_deg": [delt_ant_l_min_onset, delt_ant_l_max_onset],
-            "offset_deg": [delt_ant_l_min_offset, delt_ant_l_max_offset],
-            "pulse_intensity": [6, 10],  # TOBECHANGED
-        },
-    }
-    return PARAMS_BOUNDS
-
-PARAMS_BOUNDS = set_param_bounds()
\ No newline at end of file
+    params_bounds = {}
+    for muscle1_name, muscle2_name in MUSCLE_PAIRS:
+        bounds = get_bounds_for_muscle(muscle1_name, muscle2_name, default_min_angle=30, default_max_angle=30)
+        params_bounds[muscle1_name] = _muscle_bounds(muscle1_name, *bounds[:4])
+        params_bounds[muscle2_name] = _muscle_bounds(muscle2_name, *bounds[4:])
+    return MappingProxyType(params_bounds)
+
+PARAMS_BOUNDS = set_param_bounds()
+
+# PARAMS_BOUNDS as one read-only array of shape (n_muscles, n_params, 2), the rows follow PARAMS_BOUNDS_MUSCLES and the
+# columns PARAMS_BOUNDS_KEYS
+PARAMS_BOUNDS_MUSCLES = tuple(PARAMS_BOUNDS.keys())
+PARAMS_BOUNDS_KEYS = ("onset_deg", "offset_deg", "pulse_intensity")
+PARAMS_BOUNDS_ARRAY = np.array(
+    [[PARAMS_BOUNDS[muscle][key] for key in PARAMS_BOUNDS_KEYS] for muscle in PARAMS_BOUNDS_MUSCLES], dtype=np.float64
+)
+PARAMS_BOUNDS_ARRAY.flags.writeable = False
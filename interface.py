@@ -1,4 +1,5 @@
 import pickle
+from collections import deque
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QMainWindow,
@@ -15,7 +16,7 @@ from PyQt6.QtWidgets import (
     QApplication,
 )
 from PyQt6.QtGui import QPainter, QColor, QPen, QPolygon
-from PyQt6.QtCore import Qt, QTimer, QPoint
+from PyQt6.QtCore import Qt, QTimer, QPoint, QRect, QEvent, pyqtSignal
 
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
@@ -30,19 +31,93 @@ from pedal_worker import PedalWorker
 class MarkedSlider(QSlider):
     """QSlider with a visual marker for the best value."""
 
+    # Drawing tools of the marker, shared by all the sliders. The triangles are anchored at the marker position on the
+    # top and bottom of the groove, the painter is translated there before drawing them.
+    _MARKER_COLOR = QColor(255, 215, 0)  # Gold color
+    _MARKER_PEN = QPen(_MARKER_COLOR, 3)
+    _TOP_TRIANGLE = QPolygon([QPoint(0, -5), QPoint(-4, -10), QPoint(4, -10)])
+    _BOTTOM_TRIANGLE = QPolygon([QPoint(0, 5), QPoint(-4, 10), QPoint(4, 10)])
+
     def __init__(self, orientation):
         super().__init__(orientation)
         self.best_value = None
+        # The groove only moves when the widget is resized or restyled, so it is not queried at each paint
+        self._groove_rect = None
 
     def set_best_value(self, value):
         """Set the position of the best value marker."""
+        old_rect = self.marker_rect()
         self.best_value = value
-        self.update()  # Trigger repaint
+        self._update_marker(old_rect)  # Trigger repaint
 
     def clear_best_value(self):
         """Remove the best value marker."""
+        old_rect = self.marker_rect()
         self.best_value = None
-        self.update()
+        self._update_marker(old_rect)
+
+    def _update_marker(self, old_rect):
+        """Only repaint the areas of the previous and current markers."""
+        if old_rect is not None:
+            self.update(old_rect)
+        new_rect = self.marker_rect()
+        if new_rect is not None:
+            self.update(new_rect)
+
+    def resizeEvent(self, event):
+        self._groove_rect = None
+        super().resizeEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.StyleChange:
+            self._groove_rect = None
+        super().changeEvent(event)
+
+    def groove_rect(self):
+        """Return the slider groove geometry, computed once per size/style."""
+        if self._groove_rect is None:
+            opt = QStyleOptionSlider()
+            self.initStyleOption(opt)
+            self._groove_rect = self.style().subControlRect(
+                QStyle.ComplexControl.CC_Slider,
+                opt,
+                QStyle.SubControl.SC_SliderGroove,
+                self
+            )
+        return self._groove_rect
+
+    def marker_position(self):
+        """Return the (x, y_top, y_bottom) pixel position of the best value marker, or None if there is none to draw."""
+        if self.best_value is None or self.orientation() != Qt.Orientation.Horizontal:
+            return None
+
+        # Calculate position of the marker
+        slider_min = self.minimum()
+        slider_max = self.maximum()
+        slider_range = slider_max - slider_min
+
+        if slider_range == 0:
+            return None
+
+        groove_rect = self.groove_rect()
+
+        # Calculate pixel position
+        value_ratio = (self.best_value - slider_min) / slider_range
+        x_pos = groove_rect.x() + int(groove_rect.width() * value_ratio)
+        return x_pos, groove_rect.y(), groove_rect.y() + groove_rect.height()
+
+    @staticmethod
+    def _marker_rect(x_pos, y_top, y_bottom):
+        # The triangles are 4 px wide on each side of the line and end 10 px away from the groove, plus 1 px for the
+        # antialiasing
+        return QRect(x_pos - 5, y_top - 11, 11, y_bottom - y_top + 23)
+
+    def marker_rect(self):
+        """Return the area covered by the best value marker, or None if there is none."""
+        position = self.marker_position()
+        if position is None:
+            return None
+        return self._marker_rect(*position)
 
     def paintEvent(self, event):
         """Override paint to draw the marker."""
@@ -50,64 +125,31 @@ class MarkedSlider(QSlider):
         super().paintEvent(event)
 
         # Then draw our custom marker if set
-        if self.best_value is None:
+        position = self.marker_position()
+        if position is None:
             return
+        x_pos, y_top, y_bottom = position
 
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
-        # Calculate position of the marker
-        slider_min = self.minimum()
-        slider_max = self.maximum()
-        slider_range = slider_max - slider_min
-
-        if slider_range == 0:
-            painter.end()
+        # Nothing to do if the marker is not in the area being repainted (e.g. only the handle moved)
+        if not event.region().intersects(self._marker_rect(x_pos, y_top, y_bottom)):
             return
 
-        # Get slider geometry using proper QStyleOptionSlider
-        opt = QStyleOptionSlider()
-        self.initStyleOption(opt)
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
 
-        groove_rect = self.style().subControlRect(
-            QStyle.ComplexControl.CC_Slider,
-            opt,
-            QStyle.SubControl.SC_SliderGroove,
-            self
-        )
+        # Work relative to the top of the groove at the best value position
+        painter.translate(x_pos, y_top)
 
-        # Calculate pixel position
-        value_ratio = (self.best_value - slider_min) / slider_range
+        # Draw a vertical line at the best value position
+        painter.setPen(self._MARKER_PEN)
+        painter.drawLine(0, -5, 0, y_bottom - y_top + 5)
 
-        if self.orientation() == Qt.Orientation.Horizontal:
-            x_pos = groove_rect.x() + int(groove_rect.width() * value_ratio)
-            y_top = groove_rect.y()
-            y_bottom = groove_rect.y() + groove_rect.height()
-
-            # Draw a vertical line at the best value position
-            pen = QPen(QColor(255, 215, 0), 3)  # Gold color
-            painter.setPen(pen)
-            painter.drawLine(x_pos, y_top - 5, x_pos, y_bottom + 5)
-
-            # Draw small triangles at top and bottom
-            painter.setBrush(QColor(255, 215, 0))
-            painter.setPen(Qt.PenStyle.NoPen)
-
-            # Top triangle
-            points_top = QPolygon([
-                QPoint(x_pos, y_top - 5),
-                QPoint(x_pos - 4, y_top - 10),
-                QPoint(x_pos + 4, y_top - 10)
-            ])
-            painter.drawPolygon(points_top)
-
-            # Bottom triangle
-            points_bottom = QPolygon([
-                QPoint(x_pos, y_bottom + 5),
-                QPoint(x_pos - 4, y_bottom + 10),
-                QPoint(x_pos + 4, y_bottom + 10)
-            ])
-            painter.drawPolygon(points_bottom)
+        # Draw small triangles at top and bottom
+        painter.setBrush(self._MARKER_COLOR)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.drawPolygon(self._TOP_TRIANGLE)
+        painter.translate(0, y_bottom - y_top)
+        painter.drawPolygon(self._BOTTOM_TRIANGLE)
 
         painter.end()
 
@@ -115,6 +157,9 @@ class MarkedSlider(QSlider):
 class MuscleSection(QGroupBox):
     """A section containing three sliders for a single muscle."""
 
+    # (muscle_key, parameter name, value) emitted when a slider of the section is moved
+    paramChanged = pyqtSignal(str, str, float)
+
     def __init__(self, muscle_key: str, muscle_name: str, parent=None):
         super().__init__(muscle_name, parent)
         self.muscle_key = muscle_key
@@ -159,7 +204,9 @@ class MuscleSection(QGroupBox):
         layout = QHBoxLayout()
 
         # Scale factor for 0.5 precision (internal: 0-200, display: 0.0-100.0)
+        # The slider value times inv_scale gives the displayed value
         scale = 1/increments
+        inv_scale = increments
 
         # Label
         label = QLabel(f"{name}:")
@@ -172,9 +219,9 @@ class MuscleSection(QGroupBox):
 
         # Slider (scaled for 0.5 precision)
         slider = MarkedSlider(Qt.Orientation.Horizontal)
-        slider.setMinimum(int(min_val * scale))
-        slider.setMaximum(int(max_val * scale))
-        slider.setValue(int(default_val * scale))
+        slider.setMinimum(round(min_val * scale))
+        slider.setMaximum(round(max_val * scale))
+        slider.setValue(round(default_val * scale))
 
         # Plus button
         plus_btn = QPushButton("+")
@@ -187,10 +234,15 @@ class MuscleSection(QGroupBox):
         plus_btn.setFixedHeight(20)
         value_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
 
-        # Connect slider to update value label
-        slider.valueChanged.connect(
-            lambda v: value_label.setText(f"{v / scale:.1f}")
-        )
+        # Connect slider to update value label and notify the new value of the parameter
+        param_name = name.lower()
+
+        def on_value_changed(v):
+            value = v * inv_scale
+            value_label.setText(f"{value:.1f}")
+            self.paramChanged.emit(self.muscle_key, param_name, value)
+
+        slider.valueChanged.connect(on_value_changed)
 
         # Connect buttons
         def increment_slider():
@@ -225,22 +277,23 @@ class MuscleSection(QGroupBox):
             'slider': slider,
             'value_label': value_label,
             'scale': scale,
+            'inv_scale': inv_scale,
             'minus_btn': minus_btn,
             'plus_btn': plus_btn
         }
 
     def set_best_values(self, onset, offset, intensity):
         """Mark the best parameter values on all sliders."""
-        self.onset_slider['slider'].set_best_value(int(onset * self.onset_slider['scale']))
-        self.offset_slider['slider'].set_best_value(int(offset * self.offset_slider['scale']))
-        self.intensity_slider['slider'].set_best_value(int(intensity * self.intensity_slider['scale']))
+        self.onset_slider['slider'].set_best_value(round(onset * self.onset_slider['scale']))
+        self.offset_slider['slider'].set_best_value(round(offset * self.offset_slider['scale']))
+        self.intensity_slider['slider'].set_best_value(round(intensity * self.intensity_slider['scale']))
 
     def get_best_values(self):
         """Return slider best values."""
         return {
-            'onset': self.onset_slider['slider'].best_value / self.onset_slider['scale'],
-            'offset': self.offset_slider['slider'].best_value / self.offset_slider['scale'],
-            'intensity': self.intensity_slider['slider'].best_value / self.intensity_slider['scale']
+            'onset': self.onset_slider['slider'].best_value * self.onset_slider['inv_scale'],
+            'offset': self.offset_slider['slider'].best_value * self.offset_slider['inv_scale'],
+            'intensity': self.intensity_slider['slider'].best_value * self.intensity_slider['inv_scale']
         }
 
     def clear_best_values(self):
@@ -252,15 +305,18 @@ class MuscleSection(QGroupBox):
     def get_values(self):
         """Return current slider values."""
         return {
-            'onset': self.onset_slider['slider'].value() / self.onset_slider['scale'],
-            'offset': self.offset_slider['slider'].value() / self.offset_slider['scale'],
-            'intensity': self.intensity_slider['slider'].value() / self.intensity_slider['scale']
+            'onset': self.onset_slider['slider'].value() * self.onset_slider['inv_scale'],
+            'offset': self.offset_slider['slider'].value() * self.offset_slider['inv_scale'],
+            'intensity': self.intensity_slider['slider'].value() * self.intensity_slider['inv_scale']
         }
 
 
 class PlotCanvas(FigureCanvas):
     """Matplotlib canvas for the plot at the bottom."""
 
+    # (left_power, right_power) of a completed cycle, emitted from the pedal thread
+    cycleCompleted = pyqtSignal(float, float)
+
     def __init__(self, worker_pedal: PedalWorker, side: str, muscle_sections: dict, parent = None):
 
         self.worker_pedal = worker_pedal
@@ -268,8 +324,12 @@ class PlotCanvas(FigureCanvas):
         # TODO: muscle_sections should be independent from the plot update, but the power computation should e placed somewhere else for that.
         self.muscle_sections = muscle_sections
 
-        # Data to plot
-        self.power_list = []
+        # Data to plot, only the last 50 cycles are shown
+        self.power_list = deque(maxlen=50)
+        # Cycle numbers of the plotted powers, sliced to the number of powers instead of being rebuilt at each update
+        self._x = np.arange(self.power_list.maxlen)
+        # Highest power since the beginning, even if it is not shown anymore
+        self._max_power = -float('inf')
 
         # Initialize figure
         self.fig = Figure(figsize=(10, 4), dpi=100)
@@ -277,7 +337,8 @@ class PlotCanvas(FigureCanvas):
         super().__init__(self.fig)
         self.setParent(parent)
 
-        # Initial plot setup
+        # Initial plot setup, the axes are kept and only the data of the power line is updated
+        self._line, = self.ax.step([], [], color='blue')
         self.ax.set_xlabel('Cycles')
         self.ax.set_ylabel(f'Power {side} [W]')
         self.ax.grid(True, alpha=0.7)
@@ -285,55 +346,40 @@ class PlotCanvas(FigureCanvas):
         self.setup_live_plot()
 
     def setup_live_plot(self):
-        """Set up timer for live data updates."""
-
-        self.plot_timer = QTimer(self)
-        self.plot_timer.timeout.connect(self.update_live_plot)
-        self.plot_timer.start(50)  # 50ms = 20 Hz
-
-    def update_live_plot(self):
-        """Called every 10ms to update plot with new data."""
-        last_cycle_data = self.worker_pedal.get_last_cycle_data()
-        nb_cycles = len(last_cycle_data["times_vector"])
-
-        if nb_cycles == 0:
-            return
+        """Update the plot each time the pedal worker completes a cycle."""
+        # Queued, so that the plot is updated in the GUI thread
+        self.cycleCompleted.connect(self.update_live_plot, Qt.ConnectionType.QueuedConnection)
+        # The same callback object is kept to unregister it, so that the pedal worker does not keep emitting on a
+        # deleted canvas
+        cycle_callback = self.cycleCompleted.emit
+        worker_pedal = self.worker_pedal
+        worker_pedal.add_cycle_callback(cycle_callback)
+        self.destroyed.connect(lambda: worker_pedal.remove_cycle_callback(cycle_callback))
+
+    def update_live_plot(self, left_power: float, right_power: float):
+        """Called for each completed cycle to update plot with new data."""
+        if self.side == "Left":
+            power = left_power
+        elif self.side == "Right":
+            power = right_power
         else:
-            if self.side == "Left":
-                power = np.nanmean(np.abs(last_cycle_data["left_power"][-1]))
-            elif self.side == "Right":
-                power = np.nanmean(np.abs(last_cycle_data["right_power"][-1]))
-            else:
-                raise ValueError(f"Unknown side: {self.side}")
-
-            if len(self.power_list) == 0:
-                self.power_list += [power]
-            elif power == self.power_list[-1]:
-                return
-            else:
-                self.power_list += [power]
-
-            # Keep only the last 50 cycles
-            nb_cycles_to_show = 50
-            if len(self.power_list) > nb_cycles_to_show:
-                power_to_plot = self.power_list[-nb_cycles_to_show:]
-            else:
-                power_to_plot = self.power_list
+            raise ValueError(f"Unknown side: {self.side}")
 
-            self.ax.cla()
-            self.ax.step(np.arange(len(power_to_plot)), power_to_plot, color='blue')
-            self.ax.relim()
-            self.ax.autoscale_view()
-            self.ax.set_xlabel('Cycles')
-            self.ax.set_ylabel(f'Power {self.side} [W]')
-            self.ax.grid(True, alpha=0.7)
-            self.fig.tight_layout()
-            self.draw()
+        self.power_list.append(power)
+        is_new_max = power >= self._max_power
+        if is_new_max:
+            self._max_power = power
 
+        nb_powers = len(self.power_list)
+        power_to_plot = np.fromiter(self.power_list, dtype=np.float64, count=nb_powers)
+        self._line.set_data(self._x[:nb_powers], power_to_plot)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.draw_idle()
 
-            # Update the marker on the slide bar if a new max power is reached
-            if power >= max(self.power_list):
-                self.update_best_markers()
+        # Update the marker on the slide bar if a new max power is reached
+        if is_new_max:
+            self.update_best_markers()
 
     def update_best_markers(self):
         """Update the best value markers on relevant muscle sections."""
@@ -351,27 +397,65 @@ class PlotCanvas(FigureCanvas):
 class Interface(QMainWindow):
     """Main application window."""
 
+    # Column of each slider parameter in the parameters array
+    _FIELD_IDX = {'onset': 0, 'offset': 1, 'intensity': 2}
+
+    # Style of the countdown depending on the remaining time, and once the values are saved
+    _TIMER_STYLE_SHEETS = {
+        "green": """
+            QLabel {
+                font-size: 36px;
+                font-weight: bold;
+                color: #ffffff;
+                background-color: #144c3c;
+            }
+        """,
+        "orange": """
+            QLabel {
+                font-size: 36px;
+                font-weight: bold;
+                color: #f39c12;
+                background-color: #2c3e50;
+            }
+        """,
+        "red": """
+            QLabel {
+                font-size: 36px;
+                font-weight: bold;
+                color: #ffffff;
+                background-color: #e74c3c;
+            }
+        """,
+        "saved": """
+            QLabel {
+                font-size: 36px;
+                font-weight: bold;
+                color: #ffffff;
+                background-color: #27ae60;
+            }
+        """,
+    }
+
     def __init__(
             self,
             worker_stim: StimulationWorker,
             worker_pedal: PedalWorker,
-            muscle_mode: MuscleMode.BOTH
+            muscle_mode: MuscleMode
     ):
         super().__init__(parent=None)
         self.worker_stim = worker_stim
         self.worker_pedal = worker_pedal
-        if not isinstance(muscle_mode, MuscleMode.BOTH):
+        if muscle_mode is not MuscleMode.BOTH:
             raise ValueError("muscle_mode must be MuscleMode.BOTH for this interface.")
         self.muscle_mode = muscle_mode
 
-        # Store the parameters for each muscle
-        self.parameters = {}
-        for muscle in self.muscle_mode.muscle_keys:
-            self.parameters[muscle] = {
-                'onset': 0,
-                'offset': 0,
-                'intensity': 0,
-            }
+        # Store the parameters for each muscle (muscles x [onset, offset, intensity]), in the order of the StimParameters
+        # vector that wraps it without copying. The parameters with the angles offset that are sent to the stimulator
+        # are also updated in place, so that no new StimParameters is created for each slider change.
+        self._muscle_idx = {muscle: i for i, muscle in enumerate(self.muscle_mode.muscle_keys)}
+        self._params_arr = np.zeros((len(self._muscle_idx), len(self._FIELD_IDX)))
+        self._params_buf = StimParameters._from_vector(self._params_arr.reshape(-1))
+        self._params_out = StimParameters()
 
         # create the main window
         self.setWindowTitle("Muscle Control GUI")
@@ -379,40 +463,27 @@ class Interface(QMainWindow):
 
         # Timer variables (7 minutes 30 seconds = 450 seconds)
         self.remaining_time = 7 * 60 + 30  # 450 seconds
+        # Color of the countdown currently applied, the style sheet is only set again when it changes
+        self._timer_bucket = None
+
+        # The parameters are sent to the stimulator once a burst of slider changes is over
+        self._apply_timer = QTimer(self)
+        self._apply_timer.setSingleShot(True)
+        self._apply_timer.setInterval(30)
+        self._apply_timer.timeout.connect(self._flush_params)
 
         self.setup_ui()
         self.setup_timer()
 
     def set_param_value(self, muscle_key, param_name, value):
-        # Set the parameter value for a given muscle
-        self.parameters[muscle_key][param_name] = value
-        params = StimParameters(
-            self.parameters["biceps_r"]["onset"],
-            self.parameters["biceps_r"]["offset"],
-            self.parameters["biceps_r"]["intensity"],
-            self.parameters["triceps_r"]["onset"],
-            self.parameters["triceps_r"]["offset"],
-            self.parameters["triceps_r"]["intensity"],
-            self.parameters["biceps_l"]["onset"],
-            self.parameters["biceps_l"]["offset"],
-            self.parameters["biceps_l"]["intensity"],
-            self.parameters["triceps_l"]["onset"],
-            self.parameters["triceps_l"]["offset"],
-            self.parameters["triceps_l"]["intensity"],
-            self.parameters["delt_post_r"]["onset"],
-            self.parameters["delt_post_r"]["offset"],
-            self.parameters["delt_post_r"]["intensity"],
-            self.parameters["delt_ant_r"]["onset"],
-            self.parameters["delt_ant_r"]["offset"],
-            self.parameters["delt_ant_r"]["intensity"],
-            self.parameters["delt_post_l"]["onset"],
-            self.parameters["delt_post_l"]["offset"],
-            self.parameters["delt_post_l"]["intensity"],
-            self.parameters["delt_ant_l"]["onset"],
-            self.parameters["delt_ant_l"]["offset"],
-            self.parameters["delt_ant_l"]["intensity"],
-        )
-        params_to_send = params.add_angles_offset()
+        # Set the parameter value for a given muscle, it is sent to the stimulator when no other change came for 30ms
+        self._params_arr[self._muscle_idx[muscle_key], self._FIELD_IDX[param_name]] = value
+        self._apply_timer.start()
+
+    def _flush_params(self):
+        """Send the current parameters of all the muscles to the stimulation worker."""
+        # apply_parameters copies the values it needs, so the same output buffer can be reused for the next flush
+        params_to_send = self._params_buf.add_angles_offset(out=self._params_out)
 
         # Send the updated parameters to the stimulation worker
         try:
@@ -459,16 +530,7 @@ class Interface(QMainWindow):
         for muscle in muscle_names:
             section = MuscleSection(muscle, muscle_names[muscle])
 
-            section.onset_slider["slider"].valueChanged.connect(
-                lambda value, m=muscle, s=section: self.set_param_value(m, 'onset', value / s.onset_slider['scale'])
-            )
-            section.offset_slider["slider"].valueChanged.connect(
-                lambda value, m=muscle, s=section: self.set_param_value(m, 'offset', value / s.offset_slider['scale'])
-            )
-            section.intensity_slider["slider"].valueChanged.connect(
-                lambda value, m=muscle, s=section: self.set_param_value(m, 'intensity',
-                                                                        value / s.intensity_slider['scale'])
-            )
+            section.paramChanged.connect(self.set_param_value)
 
             self.muscle_sections[muscle_names[muscle]] = section
             if muscle.endswith("_l"):
@@ -518,34 +580,17 @@ class Interface(QMainWindow):
             minutes = self.remaining_time // 60
             seconds = self.remaining_time % 60
             self.timer_label.setText(f"{minutes:02d}:{seconds:02d}")
-            self.timer_label.setStyleSheet("""
-                QLabel {
-                    font-size: 36px;
-                    font-weight: bold;
-                    color: #ffffff;
-                    background-color: #144c3c;
-                }
-            """)
 
             # Change color when time is running low
             if self.remaining_time <= 60:
-                self.timer_label.setStyleSheet("""
-                    QLabel {
-                        font-size: 36px;
-                        font-weight: bold;
-                        color: #ffffff;
-                        background-color: #e74c3c;
-                    }
-                """)
+                bucket = "red"
             elif self.remaining_time <= 120:
-                self.timer_label.setStyleSheet("""
-                    QLabel {
-                        font-size: 36px;
-                        font-weight: bold;
-                        color: #f39c12;
-                        background-color: #2c3e50;
-                    }
-                """)
+                bucket = "orange"
+            else:
+                bucket = "green"
+            if bucket != self._timer_bucket:
+                self.timer_label.setStyleSheet(self._TIMER_STYLE_SHEETS[bucket])
+                self._timer_bucket = bucket
         else:
             self.timer.stop()
             self.timer_label.setText("00:00")
@@ -560,13 +605,15 @@ class Interface(QMainWindow):
         }
 
         for name, section in self.muscle_sections.items():
-            data['muscles'][name] = section.get_values()
-            data['muscles_best_slider'][name] = section.get_values()
+            values = section.get_values()
+            data['muscles'][name] = values
+            # A separate copy, so that modifying one entry of the loaded data does not change the other
+            data['muscles_best_slider'][name] = dict(values)
 
         filename = f"muscle_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pkl"
 
         with open(filename, 'wb') as f:
-            pickle.dump(data, f)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
 
         print(f"Data saved to {filename}")
         print("Saved data:")
@@ -575,14 +622,8 @@ class Interface(QMainWindow):
 
         # Update timer label to show saved status
         self.timer_label.setText("SAVED!")
-        self.timer_label.setStyleSheet("""
-            QLabel {
-                font-size: 36px;
-                font-weight: bold;
-                color: #ffffff;
-                background-color: #27ae60;
-            }
-        """)
+        self.timer_label.setStyleSheet(self._TIMER_STYLE_SHEETS["saved"])
+        self._timer_bucket = "saved"
 
         # Stop the stimulation and pedal workers
         self.stop_event.set()
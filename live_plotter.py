@@ -15,7 +15,7 @@ from constants import PARAMS_BOUNDS, STIMULATION_RANGE
 class LivePlotter:
     """Separate class to handle live plotting in a thread"""
 
-    def __init__(self, muscle_mode:MuscleMode.BICEPS_TRICEPS | MuscleMode.DELTOIDS):
+    def __init__(self, muscle_mode:MuscleMode):
 
         self.muscle_mode =muscle_mode
 
@@ -13,7 +13,7 @@ def load_results(file_path: str):
     parameters_list = results['parameter_list']
     return cost_list, parameters_list
 
-def plot_results(cost_list, parameters_list,  muscle_mode: MuscleMode.BICEPS_TRICEPS | MuscleMode.DELTOIDS):
+def plot_results(cost_list, parameters_list,  muscle_mode: MuscleMode):
 
     colors = np.arange(100)[:len(cost_list[list(cost_list.keys())[0]])]
     n_muscles = len(muscle_mode.muscle_keys)
@@ -56,7 +56,7 @@ def plot_results(cost_list, parameters_list,  muscle_mode: MuscleMode.BICEPS_TRI
 
 if __name__ == "__main__":
 
-    muscle_mode = MuscleMode.DELTOIDS()  # TOBECHANGED: MuscleMode.BICEPS_TRICEPS() or MuscleMode.DELTOIDS()
+    muscle_mode = MuscleMode.DELTOIDS  # TOBECHANGED: MuscleMode.BICEPS_TRICEPS or MuscleMode.DELTOIDS
 
     costs_list, parameters_list = load_results(f"bo_results_{muscle_mode.value}.pkl")
 
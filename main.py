@@ -16,7 +16,7 @@ from common_types import MuscleMode
 
 from pedal_communication import PedalDevice, DataCollector
 
-MUSCLE_MODE = MuscleMode.BICEPS_TRICEPS()  # TOBECHANGED
+MUSCLE_MODE = MuscleMode.BICEPS_TRICEPS  # TOBECHANGED
 
 def start_stimulation_optimization(data_collector: DataCollector) -> None:
 
@@ -43,6 +43,16 @@ class PedalWorker:
         self._left_power: float = 0.0
         self._right_power: float = 0.0
 
+        # Indices of the samples starting a new cycle since the last clear_data, detected as the samples arrive
+        # (protected by _lock)
+        self._cycle_boundaries: list[int] = []
+        self._nb_samples_scanned: int = 0
+        # Number of clear_data calls, to ignore the buffers read before the last one
+        self._nb_clears: int = 0
+        self._cycle_completed = threading.Condition(self._lock)
+        # Consumers called with the (left, right) mean absolute power of each completed cycle (protected by _lock)
+        self._cycle_callbacks: list[Callable[[float, float], None]] = []
+
         # States for the estimation of the angle by integrating speed (higher frequency than 50 Hz)
         self._previous_angle: float = 0
         self._previous_speed: float = 0
@@ -105,56 +115,100 @@ class PedalWorker:
     @staticmethod
     def rotated_angle(angles: np.ndarray) -> np.ndarray:
         """Shift the angle by -90 degrees and then wrap it to [0, 360] degrees."""
-        rotated_angles = np.zeros_like(angles)
-        for i_frame in range(angles.shape[0]):
-            shifted_angle = angles[i_frame] - np.pi/2  # Shift by -90 degrees
-            rotated_angles[i_frame] = shifted_angle % (2 * np.pi)  # Wrap to [0, 2π]
+        rotated_angles = np.subtract(angles, np.pi / 2)  # Shift by -90 degrees
+        np.mod(rotated_angles, 2 * np.pi, out=rotated_angles)  # Wrap to [0, 2π]
         return rotated_angles
 
-    def get_last_cycle_data(self) -> dict[str, list[np.ndarray]]:
+    @staticmethod
+    def cycle_boundaries_mask(angles: np.ndarray) -> np.ndarray:
         """
-        Extract the last nb_cycles from the data collector buffer.
-        Each cycle is defined as angle going from 0° to 360°.
+        Detect the samples where a new cycle starts, i.e. where the angle (in radians, not wrapped) crosses a multiple
+        of 2π going forward. Element i of the mask corresponds to the transition between angles[i] and angles[i + 1].
         """
+        # Number of complete rotations at each sample, a new cycle starts when it increases
+        nb_rotations = angles // (2 * np.pi)
+        return nb_rotations[1:] > nb_rotations[:-1]
+
+    def clear_data(self) -> None:
+        """Clear the data collector buffer and restart the count of completed cycles."""
         with self._lock:
-            times_vector = self.data_collector.data.timestamp.copy()
-            angles = self.data_collector.data.values[:, DataType.A18.value].copy()
-            left_power = self.data_collector.data.values[:, DataType.A36.value].copy()
-            right_power = self.data_collector.data.values[:, DataType.A37.value].copy()
-            total_power = self.data_collector.data.values[:, DataType.A38.value].copy()
-
-        last_cycle_data = {
-            "times_vector": [],
-            "angles": [],
-            "left_power": [],
-            "right_power": [],
-            "total_power": [],
-        }
-        last_idx = len(angles) - 1
-        last_bound = None
-        while last_idx > 0:
-            current_angle = angles[last_idx]
-            previous_angle = angles[last_idx - 1]
-            nb_rotations = current_angle // (2 * np.pi)
-            if np.sign(current_angle - (nb_rotations * 2 * np.pi)) != np.sign(
-                    previous_angle - (nb_rotations * 2 * np.pi)):
-                if last_bound is None:
-                    # The end of the last cycle was detected
-                    last_bound = last_idx
-                else:
-                    # The beginning of this cycle was detected, extract data for this cycle
-                    start_idx = last_idx
-                    end_idx = last_bound
-                    last_cycle_data["times_vector"].insert(0, times_vector[start_idx:end_idx])
-                    last_cycle_data["angles"].insert(0, self.rotated_angle(angles[start_idx:end_idx]))
-                    last_cycle_data["left_power"].insert(0, left_power[start_idx:end_idx])
-                    last_cycle_data["right_power"].insert(0, right_power[start_idx:end_idx])
-                    last_cycle_data["total_power"].insert(0, total_power[start_idx:end_idx])
-                    last_bound = last_idx
+            self.data_collector.clear()
+            self._cycle_boundaries = []
+            self._nb_samples_scanned = 0
+            self._nb_clears += 1
+
+    def _detect_new_cycles(self, values: np.ndarray, nb_clears: int) -> None:
+        """
+        Detect the cycle boundaries in the samples received since the last call, so that the whole buffer is not
+        rescanned each time, and wake up the threads waiting for cycles.
+        values is the collector buffer already read by the loop and nb_clears the number of clear_data calls before it
+        was read. If the buffer was cleared since, it is skipped and the next read is scanned instead.
+        """
+        with self._lock:
+            if nb_clears != self._nb_clears:
+                return
+            angles = values[:, DataType.A18.value]
+            if angles.shape[0] < self._nb_samples_scanned:
+                # The buffer was cleared from elsewhere
+                self._cycle_boundaries = []
+                self._nb_samples_scanned = 0
+            # Start from the last scanned sample to catch a boundary between the previous and the new samples
+            first_idx = max(self._nb_samples_scanned - 1, 0)
+            new_boundaries = np.flatnonzero(self.cycle_boundaries_mask(angles[first_idx:])) + first_idx + 1
+            self._nb_samples_scanned = angles.shape[0]
+            if new_boundaries.shape[0] == 0:
+                return
+            self._cycle_boundaries += new_boundaries.tolist()
+            self._cycle_completed.notify_all()
+
+            if len(self._cycle_boundaries) < 2 or not self._cycle_callbacks:
+                return
+            callbacks = list(self._cycle_callbacks)
+            start_idx, end_idx = self._cycle_boundaries[-2:]
+
+        # Outside of the lock, values is a local snapshot and the consumers can call the accessors of this worker
+        last_cycle = values[start_idx:end_idx]
+        left_power = float(np.nanmean(np.abs(last_cycle[:, DataType.A36.value])))
+        right_power = float(np.nanmean(np.abs(last_cycle[:, DataType.A37.value])))
+        for callback in callbacks:
+            try:
+                callback(left_power, right_power)
+            except Exception as exc:
+                # A failing consumer must not stop the pedal loop
+                self._logger.exception("Error in cycle callback %s: %s", callback, exc)
+
+    def add_cycle_callback(self, callback: Callable[[float, float], None]) -> None:
+        """
+        Register callback(left_power, right_power), called from the pedal thread with the mean absolute power of each
+        completed cycle.
+        """
+        with self._lock:
+            self._cycle_callbacks.append(callback)
 
-            last_idx -= 1
+    def remove_cycle_callback(self, callback: Callable[[float, float], None]) -> None:
+        """Unregister a callback added with add_cycle_callback, if it is still registered."""
+        with self._lock:
+            if callback in self._cycle_callbacks:
+                self._cycle_callbacks.remove(callback)
+
+    def get_cycle_boundaries(self) -> list[int]:
+        """Indices of the samples starting a new cycle in the data collector buffer."""
+        with self._lock:
+            return list(self._cycle_boundaries)
 
-        return last_cycle_data
+    def wait_for_cycles(self, nb_cycles: int, check_interval: float = 0.1) -> bool:
+        """
+        Block until nb_cycles cycles were completed since the last clear_data.
+        Return False if the pedal worker stopped (or a stop was requested) before, as no more cycles would come.
+        """
+        with self._cycle_completed:
+            while not self._cycle_completed.wait_for(
+                    lambda: len(self._cycle_boundaries) >= nb_cycles or not self._keep_running,
+                    timeout=check_interval,
+            ):
+                if self.stop_event.is_set():
+                    return False
+            return len(self._cycle_boundaries) >= nb_cycles
 
     @staticmethod
     def wait():
@@ -168,6 +222,8 @@ class PedalWorker:
 
         try:
             while self._keep_running:
+                with self._lock:
+                    nb_clears = self._nb_clears
                 data = getattr(self.data_collector, "data", None)
                 if data is None or getattr(data, "empty", False):
                     self.wait()
@@ -177,6 +233,7 @@ class PedalWorker:
                 if values.size == 0:
                     self.wait()
                 else:
+                    self._detect_new_cycles(values, nb_clears)
 
                     # angle -> col 18, speed -> col 35, right power -> col 38
                     angle = math.degrees(float(values[-1, DataType.A18.value])) % 360
@@ -218,7 +275,11 @@ class PedalWorker:
             except Exception as exc:
                 self._logger.exception("Error while closing pedal device: %s", exc)
 
+            # Wake up the threads waiting for cycles, the loop may also have ended on an error
+            self.stop()
             self._logger.info("Pedal worker stopped.")
 
     def stop(self):
-        self._keep_running = False
+        with self._lock:
+            self._keep_running = False
+            self._cycle_completed.notify_all()
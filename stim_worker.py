@@ -25,7 +25,7 @@ class HandCycling2:
     BO updates only the stimulation parameters.
     """
 
-    def __init__(self, worker_pedal: PedalWorker, muscle_mode: MuscleMode.BICEPS_TRICEPS | MuscleMode.DELTOIDS):
+    def __init__(self, worker_pedal: PedalWorker, muscle_mode: MuscleMode):
 
         self.worker_pedal = worker_pedal
         self.muscle_mode = muscle_mode
@@ -182,7 +182,7 @@ class StimulationWorker:
     def __init__(
         self,
         worker_pedal: PedalWorker,
-        muscle_mode: MuscleMode.BICEPS_TRICEPS | MuscleMode.DELTOIDS,
+        muscle_mode: MuscleMode,
     ):
         # Flag to stop the thread
         self._keep_running = True
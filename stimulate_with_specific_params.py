@@ -94,7 +94,7 @@ def start_stimulate(data_collector: DataCollector):
     else:
         raise ValueError(f"Unknown RESULT_TYPE: {RESULT_TYPE}")
 
-    muscle_mode = MuscleMode.BOTH()
+    muscle_mode = MuscleMode.BOTH
 
     # Shared stop flag
     stop_event = threading.Event()
@@ -4,42 +4,72 @@ from pysciencemode import Modes, Device
 from pysciencemode import Channel as Ch
 
 
-#  Create a channel
-list_channels = [
-    Ch(
-        mode=Modes.SINGLE,
-        no_channel=4,
-        amplitude=58,  # Modify here the intensity MICK max = 71 in optim = 50
-        pulse_width=300,  # 100, 500
-        enable_low_frequency=True,
-        name="Biceps",
-        device_type=Device.Rehastim2,
-    )
-]
-
-# Create our object Stimulator
-stimulator = St(
-    port="COM3", # Enter the port on which the stimulator is connected
-    show_log=False,
-)
-
-# Initialise the channel
-stimulator.init_channel(
-    stimulation_interval=200, list_channels=list_channels, low_frequency_factor=2
-)
-
-"""
-Start the stimulation.
-It is possible to :
-- Give a time after which the stimulation will be stopped but not disconnected.
-- Update the parameters of the channel by giving a new list of channels. The channel given must have been 
-  initialised first.
-"""
-stimulator.start_stimulation()
-# stimulator.start_stimulation(stimulation_duration=10, upd_list_channels=nw_list_channel)
-
-# Stop the stimulation if still running
-stimulator.pause_stimulation()
-stimulator.end_stimulation()
-stimulator.disconnect()
-stimulator.close_port()
\ No newline at end of file
+class FamiliarizationSession:
+    """
+    Open the stimulator and initialise the channels once, so that several familiarization trials can be run without
+    reopening the port between them.
+    """
+
+    def __init__(self, list_channels: list[Ch], port: str = "COM3", stimulation_interval: int = 200):
+        self.list_channels = list_channels
+        self.port = port  # Enter the port on which the stimulator is connected
+        self.stimulation_interval = stimulation_interval
+        self.stimulator = None
+
+    def __enter__(self) -> "FamiliarizationSession":
+        # Create our object Stimulator
+        self.stimulator = St(port=self.port, show_log=False)
+
+        # Initialise the channel, __exit__ is not called if this fails so the port is released here
+        try:
+            self.stimulator.init_channel(
+                stimulation_interval=self.stimulation_interval, list_channels=self.list_channels, low_frequency_factor=2
+            )
+        except Exception:
+            self.stimulator.close_port()
+            raise
+        return self
+
+    def run_trial(self, amplitude: float = None, stimulation_duration: float = None) -> None:
+        """
+        Start the stimulation.
+        It is possible to give a time after which the stimulation will be stopped but not disconnected.
+        The same channels are reused for all trials, only their amplitude is changed when one is given.
+        """
+        if amplitude is not None:
+            for channel in self.list_channels:
+                channel.set_amplitude(amplitude)
+        self.stimulator.start_stimulation(
+            stimulation_duration=stimulation_duration, upd_list_channels=self.list_channels
+        )
+        # Stop the stimulation if still running
+        self.stimulator.pause_stimulation()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Always release the port, even if a trial or the disconnection failed
+        try:
+            self.stimulator.end_stimulation()
+            self.stimulator.disconnect()
+        finally:
+            self.stimulator.close_port()
+
+
+if __name__ == "__main__":
+
+    #  Create a channel
+    list_channels = [
+        Ch(
+            mode=Modes.SINGLE,
+            no_channel=4,
+            amplitude=58,  # Modify here the intensity MICK max = 71 in optim = 50
+            pulse_width=300,  # 100, 500
+            enable_low_frequency=True,
+            name="Biceps",
+            device_type=Device.Rehastim2,
+        )
+    ]
+
+    with FamiliarizationSession(list_channels) as session:
+        session.run_trial()
+        # for amplitude in (40, 50, 58):
+        #     session.run_trial(amplitude=amplitude, stimulation_duration=10)
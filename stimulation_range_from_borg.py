@@ -124,10 +124,10 @@ class MuscleSection(QGroupBox):
 class Interface(QMainWindow):
     """Main application window."""
 
-    def __init__(self, worker_stim: StimulationWorker, muscle_mode: MuscleMode.BOTH):
+    def __init__(self, worker_stim: StimulationWorker, muscle_mode: MuscleMode):
         super().__init__(parent=None)
         self.worker_stim = worker_stim
-        if not isinstance(muscle_mode, MuscleMode.BOTH):
+        if muscle_mode is not MuscleMode.BOTH:
             raise ValueError("muscle_mode must be MuscleMode.BOTH for this interface.")
         self.muscle_mode = muscle_mode
 
@@ -220,7 +220,7 @@ class Interface(QMainWindow):
 
 def start_stimulate(data_collector: DataCollector):
 
-    muscle_mode = MuscleMode.BOTH()
+    muscle_mode = MuscleMode.BOTH
 
     # Shared stop flag
     stop_event = threading.Event()